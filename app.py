@@ -11,13 +11,18 @@ from datetime import datetime
 # Import utility modules
 from utils.geocoding import geocode_location
 from utils.places import (
-    get_recommendations, 
+    get_recommendation_result,
     generate_simple_descriptions,
     get_destination_image,
+    report_pipeline_errors,
     CATEGORY_MAPPING
 )
 from utils.mapping import display_recommendation_map
 from utils.display import display_recommendation_cards
+from utils.cache import RecommendationCache
+from utils.core import budgets_from_env, recommendation_key
+from utils.service_client import RecommendationServiceClient, ServiceError
+from utils.tiered_cache import get_tiered_cache
 
 # Load environment variables
 load_dotenv()
@@ -29,6 +34,95 @@ GOOGLE_MAPS_API_KEY = os.getenv("GOOGLE_MAPS_API_KEY")
 gmaps = googlemaps.Client(key=GOOGLE_MAPS_API_KEY)
 llm = ChatOpenAI(temperature=0.5, model="gpt-3.5-turbo", api_key=OPENAI_API_KEY)
 
+# Recommendation cache settings (seconds)
+RECOMMENDATION_SOFT_TTL = float(os.getenv("RECOMMENDATION_SOFT_TTL", "600"))
+RECOMMENDATION_HARD_TTL = float(os.getenv("RECOMMENDATION_HARD_TTL", "3600"))
+RECOMMENDATION_TTL_JITTER = float(os.getenv("RECOMMENDATION_TTL_JITTER", "0.1"))
+
+# Per-stage latency budgets (seconds) for building recommendations; unset means no deadline
+STAGE_BUDGETS = budgets_from_env()
+
+# Use the recommendation service (service.py) when configured, otherwise run the pipeline in-process
+RECOMMENDATION_SERVICE_URL = os.getenv("RECOMMENDATION_SERVICE_URL")
+service_client = RecommendationServiceClient(RECOMMENDATION_SERVICE_URL) if RECOMMENDATION_SERVICE_URL else None
+
+# Card rendering mode: "batched" (one HTML block per page) or "classic" (one element per field)
+CARD_RENDER_MODE = os.getenv("CARD_RENDER_MODE", "batched")
+
+# One recommendation cache shared by every session on this server
+@st.cache_resource(show_spinner=False)
+def get_recommendation_cache():
+    cache = RecommendationCache(
+        soft_ttl=RECOMMENDATION_SOFT_TTL,
+        hard_ttl=RECOMMENDATION_HARD_TTL,
+        jitter=RECOMMENDATION_TTL_JITTER
+    )
+    # Entries are keyed like the tiered cache, so its invalidations drop them here too
+    get_tiered_cache().add_invalidation_listener(cache.invalidate)
+    return cache
+
+recommendation_cache = get_recommendation_cache()
+
+# Fetch recommendations through the shared cache
+def load_recommendations(category, location, coordinates, travel_style):
+    """Return recommendations for a category, serving cached results and refreshing stale ones in the background"""
+    cache_key = recommendation_key(category, location, coordinates, travel_style)
+    
+    def fetch():
+        if service_client:
+            result = service_client.recommendations(category, location, coordinates, travel_style)
+        else:
+            result = get_recommendation_result(
+                category,
+                location,
+                coordinates,
+                gmaps,
+                llm,
+                travel_style,
+                budgets=STAGE_BUDGETS,
+                # A late LLM answer replaces the fallback descriptions on the next rerun
+                on_enriched=lambda enhanced: recommendation_cache.set(cache_key, enhanced)
+            )
+        report_pipeline_errors(result.errors)
+        recommendations = result.places
+        
+        # If recommendations don't have descriptions, generate simple ones
+        if recommendations and not any(p.get('description') for p in recommendations):
+            recommendations = generate_simple_descriptions(
+                recommendations,
+                category,
+                location,
+                travel_style
+            )
+        
+        return recommendations
+    
+    def refresh():
+        # Runs on a cache worker thread with no script context, so it must not touch st.* or
+        # session state. Nobody waits on it, so it gets no LLM deadline and skips the shared
+        # tiered cache. Anything short of a clean LLM answer returns [], which the cache
+        # ignores, so good LLM text is never swapped for fallback descriptions.
+        result = get_recommendation_result(
+            category,
+            location,
+            coordinates,
+            gmaps,
+            llm,
+            travel_style,
+            budgets={**STAGE_BUDGETS, "llm": None},
+            refresh=True
+        )
+        if not result.enriched or result.errors:
+            return []
+        return result.places
+    
+    # The service keeps its own stale-while-revalidate cache and applies late LLM upgrades there,
+    # so caching its answers here again would hide those upgrades until the local TTL ran out
+    if service_client:
+        return fetch()
+    
+    return recommendation_cache.get(cache_key, fetch, refresh_loader=refresh)
+
 # Set up Streamlit UI
 st.set_page_config(page_title="IntelliTravel Agent", layout="wide")
 
@@ -111,7 +205,16 @@ with st.sidebar:
                     st.session_state.location = location_input
                     
                     # Get coordinates
-                    coordinates = geocode_location(location_input, gmaps)
+                    if service_client:
+                        try:
+                            geocoded = service_client.geocode(location_input)
+                            report_pipeline_errors(geocoded.errors)
+                            coordinates = geocoded.location
+                        except ServiceError as e:
+                            st.error(str(e))
+                            coordinates = None
+                    else:
+                        coordinates = geocode_location(location_input, gmaps)
                     if coordinates and 'lat' in coordinates and 'lng' in coordinates:
                         st.session_state.coordinates = coordinates
                         st.session_state.start_date = start_date
@@ -122,6 +225,8 @@ with st.sidebar:
                         # Reset recommendations when form is submitted with new data
                         st.session_state.recommendations = {}
                         st.session_state.current_category = None
+                        for key in [k for k in st.session_state if k.startswith("cards_shown_")]:
+                            del st.session_state[key]
 
                         # Success message
                         st.success(f"Ready to explore {location_input}!")
@@ -154,31 +259,6 @@ if st.session_state.form_submitted and st.session_state.location and st.session_
     for i, (category, icon) in enumerate(zip(categories, category_icons)):
         if cat_cols[i].button(f"{icon} {category}", use_container_width=True):
             st.session_state.current_category = category.lower()
-            
-            # Check if we already have recommendations for this category with current travel style
-            cache_key = f"{category.lower()}_{st.session_state.travel_style}"
-            if cache_key not in st.session_state.recommendations:
-                with st.spinner(f"Finding the best {category.lower()} recommendations for {st.session_state.travel_style} travelers..."):
-                    # Get recommendations with travel style
-                    recommendations = get_recommendations(
-                        category.lower(), 
-                        st.session_state.location,
-                        st.session_state.coordinates,
-                        gmaps,
-                        llm,
-                        st.session_state.travel_style
-                    )
-                    
-                    # If recommendations don't have descriptions, generate simple ones
-                    if recommendations and not any(p.get('description') for p in recommendations):
-                        recommendations = generate_simple_descriptions(
-                            recommendations,
-                            category.lower(),
-                            st.session_state.location,
-                            st.session_state.travel_style
-                        )
-                    
-                    st.session_state.recommendations[cache_key] = recommendations
     
     # Display recommendations for the selected category
     if st.session_state.current_category:
@@ -189,14 +269,27 @@ if st.session_state.form_submitted and st.session_state.location and st.session_
         style_text = f" for {st.session_state.travel_style} Travelers" if st.session_state.travel_style != "Any" else ""
         st.header(f"Top {category.title()} in {st.session_state.location}{style_text}")
         
+        # Served from the shared cache; only a first or expired lookup blocks here
+        with st.spinner(f"Finding the best {category} recommendations for {st.session_state.travel_style} travelers..."):
+            try:
+                st.session_state.recommendations[cache_key] = load_recommendations(
+                    category,
+                    st.session_state.location,
+                    st.session_state.coordinates,
+                    st.session_state.travel_style
+                )
+            except ServiceError as e:
+                st.error(str(e))
+                st.session_state.recommendations[cache_key] = []
+        
         # Check if we have recommendations
-        if cache_key in st.session_state.recommendations and st.session_state.recommendations[cache_key]:
+        if st.session_state.recommendations[cache_key]:
             # Create tabs for different views
             tab1, tab2 = st.tabs(["Recommendations", "Map View"])
             
             with tab1:
                 # Display recommendations in a card layout
-                display_recommendation_cards(st.session_state.recommendations[cache_key], category)
+                display_recommendation_cards(st.session_state.recommendations[cache_key], category, mode=CARD_RENDER_MODE)
             
             with tab2:
                 # Display map
@@ -206,37 +299,7 @@ if st.session_state.form_submitted and st.session_state.location and st.session_
                     st.session_state.coordinates
                 )
         else:
-            if cache_key not in st.session_state.recommendations:
-                with st.spinner(f"Finding the best {category} recommendations for {st.session_state.travel_style} travelers..."):
-                    # Get recommendations with travel style
-                    recommendations = get_recommendations(
-                        category, 
-                        st.session_state.location,
-                        st.session_state.coordinates,
-                        gmaps,
-                        llm,
-                        st.session_state.travel_style
-                    )
-                    
-                    # If recommendations don't have descriptions, generate simple ones
-                    if recommendations and not any(p.get('description') for p in recommendations):
-                        recommendations = generate_simple_descriptions(
-                            recommendations,
-                            category,
-                            st.session_state.location,
-                            st.session_state.travel_style
-                        )
-                    
-                    st.session_state.recommendations[cache_key] = recommendations
-                
-                # Check if we found any recommendations
-                if st.session_state.recommendations[cache_key]:
-                    # Rerun to display the recommendations
-                    st.rerun()
-                else:
-                    st.info(f"No {category} recommendations found for {st.session_state.location} with {st.session_state.travel_style} travel style.")
-            else:
-                st.info(f"No {category} recommendations found for {st.session_state.location} with {st.session_state.travel_style} travel style.")
+            st.info(f"No {category} recommendations found for {st.session_state.location} with {st.session_state.travel_style} travel style.")
 else:
     # Welcome message when no form submitted
     st.info("👈 Enter your travel details in the sidebar and click 'Find Recommendations' to get started!")
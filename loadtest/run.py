@@ -0,0 +1,310 @@
+"""
+Concurrent-session load test for app.py
+
+Runs N simulated users against the app with Streamlit's headless AppTest, using offline
+stubs for the Google Maps and OpenAI clients, and prints throughput, per-interaction latency
+percentiles, CPU and memory per session for each concurrency level.
+
+Every simulated user runs in its own process. AppTest swaps process-global Streamlit state
+(Runtime._instance and config options) on each run, so overlapping runs in one process would
+race on it. Each process therefore has its own app caches, like a separate app replica; set
+REDIS_URL to a shared Redis to let them share the L2 tier.
+
+Usage:
+    python -m loadtest.run --sessions 1 2 4 8 16 --maps-latency 0.02 --llm-latency 0.2
+    python -m loadtest.run --sessions 4 --render-mode classic
+
+Linux only: resident memory is read from /proc/self/status.
+"""
+import argparse
+import multiprocessing
+import os
+import pickle
+import queue
+import random
+import sys
+import time
+from threading import BrokenBarrierError
+from unittest import mock
+
+from streamlit.testing.v1 import AppTest
+
+from loadtest.stubs import FakeMapsClient, FakeLLM
+from utils.tiered_cache import get_tiered_cache
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_PATH = os.path.join(REPO_ROOT, "app.py")
+
+# Seconds to wait for every session process to start up before giving up on a level
+STARTUP_TIMEOUT = 300
+
+DESTINATIONS = ["Paris, France", "Tokyo, Japan", "New York, USA", "Lisbon, Portugal", "Cape Town, South Africa"]
+CATEGORIES = ["Food", "Attractions", "Activities", "Shopping", "Nightlife", "Nature"]
+TRAVEL_STYLES = ["Any", "Budget", "Mid-range", "Luxury"]
+
+# Resident set size of this process in bytes
+def read_rss():
+    with open("/proc/self/status") as status:
+        for line in status:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) * 1024
+    return 0
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+# One simulated user working through a realistic flow
+class SimulatedSession:
+    def __init__(self, session_id, timeout):
+        self.session_id = session_id
+        self.rng = random.Random(session_id)
+        self.at = AppTest.from_file(APP_PATH, default_timeout=timeout)
+        self.timings = []
+        self.errors = []
+        self.renders = []
+
+    def run_flow(self):
+        destination = self.rng.choice(DESTINATIONS)
+        first_style, second_style = self.rng.sample(TRAVEL_STYLES, 2)
+
+        self._step("page_load", lambda: self.at.run())
+        self._step("form_submit", lambda: self._submit(destination, first_style))
+        for category in self.rng.sample(CATEGORIES, 3):
+            self._step("category_click", lambda: self._click(category))
+        self._step("style_switch", lambda: self._submit(destination, second_style))
+        self._step("category_click", lambda: self._click(self.rng.choice(CATEGORIES)))
+        # Switching tabs happens in the browser; the server-side cost is the rerun that
+        # renders both the card tab and the map tab
+        self._step("map_tab", lambda: self.at.run())
+
+    def state_size(self):
+        """Pickled size of the recommendations this session holds"""
+        try:
+            return len(pickle.dumps(self.at.session_state["recommendations"]))
+        except Exception:
+            return 0
+
+    def _submit(self, destination, travel_style):
+        self.at.text_input[0].input(destination)
+        self.at.selectbox[0].select(travel_style)
+        self._button("Find Recommendations").click()
+        self.at.run()
+
+    def _click(self, category):
+        self._button(category).click()
+        self.at.run()
+        self._record_render(category.lower())
+
+    def _record_render(self, category):
+        """Keep the card render stats display_recommendation_cards left for this category"""
+        try:
+            render_stats = self.at.session_state["card_render_stats"]
+        except KeyError:
+            return
+        if category in render_stats:
+            self.renders.append(dict(render_stats[category]))
+
+    def _button(self, label):
+        for button in self.at.button:
+            if button.label == label or button.label.endswith(f" {label}"):
+                return button
+        raise LookupError(f"No button labelled {label!r}")
+
+    def _step(self, name, action):
+        started = time.perf_counter()
+        try:
+            action()
+            if self.at.exception:
+                self.errors.append(f"{name}: {self.at.exception[0].message}")
+        except Exception as e:
+            self.errors.append(f"{name}: {e}")
+        self.timings.append((name, time.perf_counter() - started))
+
+# Entry point of a session process: run the flow and report the measurements on results
+def run_session(session_id, options, barrier, results):
+    try:
+        if REPO_ROOT not in sys.path:
+            sys.path.insert(0, REPO_ROOT)
+        maps_client = lambda *a, **kwargs: FakeMapsClient(latency=options["maps_latency"])
+        chat_model = lambda *a, **kwargs: FakeLLM(latency=options["llm_latency"])
+
+        with mock.patch("googlemaps.Client", maps_client), mock.patch("langchain_openai.ChatOpenAI", chat_model):
+            # A fresh process pays for importing the app's dependencies on its first script run,
+            # which a long-running server only does once, so do that outside the measurements
+            AppTest.from_file(APP_PATH, default_timeout=options["timeout"]).run()
+            session = SimulatedSession(session_id, options["timeout"])
+            rss_before = read_rss()
+            # Start every session together, once all processes have paid their startup cost
+            barrier.wait(STARTUP_TIMEOUT)
+
+            cpu_before = time.process_time()
+            started = time.monotonic()
+            for _ in range(options["rounds"]):
+                session.run_flow()
+            finished = time.monotonic()
+
+            results.put({
+                "session_id": session_id,
+                "timings": session.timings,
+                "errors": session.errors,
+                "renders": session.renders,
+                "state_size": session.state_size(),
+                "cpu": time.process_time() - cpu_before,
+                "rss": read_rss(),
+                "rss_growth": read_rss() - rss_before,
+                "started": started,
+                "finished": finished,
+                "tiered_cache": get_tiered_cache().stats()
+            })
+    except Exception as e:
+        barrier.abort()
+        results.put({"session_id": session_id, "failed": f"session {session_id}: {e}"})
+
+def merge_cache_stats(stats):
+    """Combine the tiered cache counters reported by each session process"""
+    counters = ("l1_hits", "l1_misses", "l2_hits", "l2_misses", "serialize_count", "serialize_seconds", "serialized_bytes")
+    total = {name: sum(session_stats[name] for session_stats in stats) for name in counters}
+    l1_lookups = total["l1_hits"] + total["l1_misses"]
+    l2_lookups = total["l2_hits"] + total["l2_misses"]
+    return {
+        "l1_hit_ratio": total["l1_hits"] / l1_lookups if l1_lookups else 0.0,
+        "l2_hit_ratio": total["l2_hits"] / l2_lookups if l2_lookups else 0.0,
+        "avg_serialize_ms": total["serialize_seconds"] * 1000 / total["serialize_count"] if total["serialize_count"] else 0.0,
+        "avg_serialized_bytes": total["serialized_bytes"] / total["serialize_count"] if total["serialize_count"] else 0.0,
+        "format": stats[0]["format"] if stats else "n/a"
+    }
+
+# Run one concurrency level and return its measurements
+def run_level(sessions, options):
+    context = multiprocessing.get_context("spawn")
+    barrier = context.Barrier(sessions + 1)
+    results = context.Queue()
+    processes = [
+        context.Process(target=run_session, args=(session_id, options, barrier, results), daemon=True)
+        for session_id in range(sessions)
+    ]
+    for process in processes:
+        process.start()
+    try:
+        barrier.wait(STARTUP_TIMEOUT)
+    except BrokenBarrierError:
+        pass
+
+    reports = []
+    deadline = time.monotonic() + STARTUP_TIMEOUT + options["timeout"] * options["rounds"] * 10
+    while len(reports) < sessions:
+        try:
+            reports.append(results.get(timeout=max(deadline - time.monotonic(), 0.1)))
+        except queue.Empty:
+            break
+    for process in processes:
+        process.join(5)
+        if process.is_alive():
+            process.terminate()
+
+    failures = [report["failed"] for report in reports if "failed" in report]
+    reports = [report for report in reports if "failed" not in report]
+    failures += [f"session {session_id}: no report" for session_id in range(sessions)
+                 if session_id not in {report["session_id"] for report in reports} and
+                 not any(failure.startswith(f"session {session_id}:") for failure in failures)]
+
+    wall = max(report["finished"] for report in reports) - min(report["started"] for report in reports) if reports else 0.0
+    timings = [timing for report in reports for timing in report["timings"]]
+    renders = [render for report in reports for render in report["renders"]]
+    by_interaction = {}
+    for name, seconds in timings:
+        by_interaction.setdefault(name, []).append(seconds)
+    reported = len(reports) or 1
+
+    return {
+        "sessions": sessions,
+        "interactions": len(timings),
+        "errors": failures + [error for report in reports for error in report["errors"]],
+        "throughput": len(timings) / wall if wall else 0.0,
+        "latency": {
+            name: {pct: percentile(values, pct) for pct in (50, 95, 99)}
+            for name, values in by_interaction.items()
+        },
+        "all_latency": {pct: percentile([seconds for _, seconds in timings], pct) for pct in (50, 95, 99)},
+        "cpu_per_session": sum(report["cpu"] for report in reports) / reported,
+        "rss_per_session": sum(report["rss"] for report in reports) / reported,
+        "rss_growth_per_session": sum(report["rss_growth"] for report in reports) / reported,
+        "state_per_session": sum(report["state_size"] for report in reports) / reported,
+        "tiered_cache": merge_cache_stats([report["tiered_cache"] for report in reports]),
+        "renders": {
+            "count": len(renders),
+            "elements": sum(render["elements"] for render in renders) / len(renders) if renders else 0.0,
+            "render_ms": sum(render["render_ms"] for render in renders) / len(renders) if renders else 0.0
+        },
+        "wall": wall
+    }
+
+def print_level(result):
+    print(f"\n== {result['sessions']} concurrent sessions ==")
+    print(f"interactions: {result['interactions']} in {result['wall']:.2f}s "
+          f"({result['throughput']:.2f}/s), errors: {len(result['errors'])}")
+    print(f"cpu/session: {result['cpu_per_session']:.3f}s, "
+          f"rss/session process: {result['rss_per_session'] / 2 ** 20:.1f} MiB "
+          f"(+{result['rss_growth_per_session'] / 2 ** 20:.2f} MiB during the flow), "
+          f"session_state recommendations: {result['state_per_session'] / 1024:.1f} KiB")
+    renders = result["renders"]
+    print(f"card renders: {renders['count']}, ~{renders['elements']:.1f} delta messages "
+          f"and {renders['render_ms']:.1f} ms per render")
+    cache = result["tiered_cache"]
+    print(f"tiered cache: L1 hit ratio {cache['l1_hit_ratio']:.2f}, L2 hit ratio {cache['l2_hit_ratio']:.2f}, "
+          f"serialize {cache['avg_serialize_ms']:.3f} ms / {cache['avg_serialized_bytes']:.0f} B ({cache['format']})")
+    print(f"{'interaction':<16}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for name, pcts in result["latency"].items():
+        print(f"{name:<16}{pcts[50] * 1000:>10.1f}{pcts[95] * 1000:>10.1f}{pcts[99] * 1000:>10.1f}")
+    for error in result["errors"][:5]:
+        print(f"  error: {error}")
+
+def print_saturation_curve(results):
+    print("\n== Saturation curve ==")
+    print(f"{'sessions':>8}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    best = 0.0
+    for result in results:
+        latency = result["all_latency"]
+        marker = ""
+        if best and result["throughput"] < best * 1.05:
+            marker = "  <- saturated"
+        best = max(best, result["throughput"])
+        print(f"{result['sessions']:>8}{result['throughput']:>10.2f}"
+              f"{latency[50] * 1000:>10.1f}{latency[95] * 1000:>10.1f}{latency[99] * 1000:>10.1f}{marker}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Concurrent-session load test for the IntelliTravel Streamlit app")
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 2, 4, 8, 16],
+                        help="concurrency levels to run, in order")
+    parser.add_argument("--rounds", type=int, default=1, help="times each session repeats the flow")
+    parser.add_argument("--maps-latency", type=float, default=0.02, help="seconds per stubbed Maps call")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="seconds per stubbed LLM call")
+    parser.add_argument("--render-mode", choices=["batched", "classic"], default="batched",
+                        help="card rendering mode passed to the app through CARD_RENDER_MODE")
+    parser.add_argument("--timeout", type=float, default=120, help="seconds allowed per script run")
+    args = parser.parse_args(argv)
+
+    # Session processes inherit the environment
+    os.environ["CARD_RENDER_MODE"] = args.render_mode
+    options = {
+        "rounds": args.rounds,
+        "timeout": args.timeout,
+        "maps_latency": args.maps_latency,
+        "llm_latency": args.llm_latency
+    }
+
+    results = []
+    for sessions in args.sessions:
+        result = run_level(sessions, options)
+        print_level(result)
+        results.append(result)
+
+    print_saturation_curve(results)
+    return 1 if any(result["errors"] for result in results) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
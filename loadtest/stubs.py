@@ -0,0 +1,80 @@
+import hashlib
+import json
+import random
+import time
+from langchain_core.messages import AIMessage
+
+# Offline stand-in for googlemaps.Client with deterministic, per-query results
+class FakeMapsClient:
+    """Answer geocode, places and place requests from generated data after a fixed delay"""
+
+    def __init__(self, key=None, latency=0.02, results_per_query=20, **kwargs):
+        self.latency = latency
+        self.results_per_query = results_per_query
+
+    def geocode(self, address):
+        time.sleep(self.latency)
+        rng = self._rng(address)
+        return [{"geometry": {"location": {"lat": rng.uniform(-60, 60), "lng": rng.uniform(-180, 180)}}}]
+
+    def places(self, query, location=None, radius=None, type=None, **kwargs):
+        time.sleep(self.latency)
+        rng = self._rng(query)
+        center = location or {"lat": 0.0, "lng": 0.0}
+        results = []
+        for i in range(self.results_per_query):
+            place_id = f"{rng.randrange(10 ** 6):06d}"
+            results.append({
+                "place_id": place_id,
+                "name": f"Place {place_id}",
+                "rating": round(rng.uniform(3.0, 5.0), 1),
+                "user_ratings_total": rng.randrange(10, 5000),
+                "price_level": rng.randrange(0, 5),
+                "vicinity": f"{rng.randrange(1, 200)} Main Street",
+                "types": [type or "point_of_interest", "establishment"],
+                "geometry": {"location": {
+                    "lat": center["lat"] + rng.uniform(-0.04, 0.04),
+                    "lng": center["lng"] + rng.uniform(-0.04, 0.04)
+                }},
+                "opening_hours": {"open_now": rng.random() > 0.3}
+            })
+        return {"results": results}
+
+    def place(self, place_id, fields=None, **kwargs):
+        time.sleep(self.latency)
+        return {"result": {
+            "formatted_address": f"{place_id} Example Avenue",
+            "formatted_phone_number": "+1 555 0100",
+            "website": f"https://example.com/{place_id}",
+            "url": f"https://maps.google.com/?cid={place_id}",
+            "opening_hours": {
+                "open_now": True,
+                "weekday_text": ["Monday: 9:00 AM – 5:00 PM"]
+            }
+        }}
+
+    @staticmethod
+    def _rng(text):
+        return random.Random(hashlib.sha256(text.encode("utf-8")).digest())
+
+# Offline stand-in for ChatOpenAI that answers the recommendation prompt
+class FakeLLM:
+    """Return a valid recommendations JSON payload for the places in the prompt after a fixed delay"""
+
+    def __init__(self, latency=0.2, **kwargs):
+        self.latency = latency
+
+    def __call__(self, prompt_value):
+        time.sleep(self.latency)
+        text = prompt_value.to_string()
+        places_data = text.split("Places data:", 1)[1].split("\n", 1)[0].strip()
+        recommendations = [
+            {
+                "place_id": place["place_id"],
+                "name": place["name"],
+                "description": f"{place['name']} is a local favourite rated {place['rating']}.",
+                "highlights": ["Popular with visitors", "Easy to reach"]
+            }
+            for place in json.loads(places_data)
+        ]
+        return AIMessage(content=json.dumps({"recommendations": recommendations}))
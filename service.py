@@ -0,0 +1,191 @@
+"""
+Local HTTP/JSON service for the recommendation pipeline
+
+Runs geocoding and recommendations from utils/core.py on a single event loop so that many
+requests can be served concurrently, with no thread held per request, and recommendation
+workers can be scaled separately from the Streamlit UI. Point the app at it with RECOMMENDATION_SERVICE_URL.
+
+Endpoints:
+    GET  /health
+    GET  /stats
+    POST /geocode          {"location": "Paris, France"}
+    POST /recommendations  {"category": "food", "location": "Paris, France",
+                            "coordinates": {"lat": 48.85, "lng": 2.35}, "travel_style": "Any"}
+    POST /invalidate       {"location": "Paris, France", "coordinates": {"lat": 48.85, "lng": 2.35},
+                            "category": "food", "travel_style": "Any"}
+                           category and travel_style are optional; without them every
+                           category or travel style for the location is dropped
+
+Usage:
+    python service.py
+"""
+import asyncio
+import os
+import googlemaps
+from aiohttp import web
+from dotenv import load_dotenv
+from langchain_openai import ChatOpenAI
+
+from utils import core
+from utils.cache import RecommendationCache
+from utils.tiered_cache import get_tiered_cache
+
+# Load environment variables
+load_dotenv()
+
+def create_app(gmaps=None, llm=None, cache=None, budgets=None):
+    """Build the aiohttp application, creating API clients from the environment when not given"""
+    app = web.Application()
+    app["gmaps"] = gmaps or googlemaps.Client(key=os.getenv("GOOGLE_MAPS_API_KEY"))
+    app["llm"] = llm or ChatOpenAI(temperature=0.5, model="gpt-3.5-turbo", api_key=os.getenv("OPENAI_API_KEY"))
+    app["cache"] = cache or RecommendationCache(
+        soft_ttl=float(os.getenv("RECOMMENDATION_SOFT_TTL", "600")),
+        hard_ttl=float(os.getenv("RECOMMENDATION_HARD_TTL", "3600")),
+        jitter=float(os.getenv("RECOMMENDATION_TTL_JITTER", "0.1")),
+        should_cache=servable
+    )
+    app["budgets"] = budgets or core.budgets_from_env()
+
+    app.on_startup.append(_on_startup)
+    app.on_cleanup.append(_on_cleanup)
+    app.router.add_get("/health", handle_health)
+    app.router.add_get("/stats", handle_stats)
+    app.router.add_post("/geocode", handle_geocode)
+    app.router.add_post("/recommendations", handle_recommendations)
+    app.router.add_post("/invalidate", handle_invalidate)
+    return app
+
+def servable(result):
+    """Whether a recommendation result may be stored; empty or failed results are returned but never cached"""
+    return result is not None and bool(result.places) and not result.errors
+
+async def _on_startup(app):
+    # Refreshes started by the cache run the pipeline on this loop too
+    loop = asyncio.get_running_loop()
+    core.configure_executor(loop)
+    core.use_event_loop(loop)
+    # Invalidations from /invalidate or other nodes drop our stale-while-revalidate entries too
+    get_tiered_cache().add_invalidation_listener(app["cache"].invalidate)
+
+async def _on_cleanup(app):
+    get_tiered_cache().remove_invalidation_listener(app["cache"].invalidate)
+
+def _bad_request(message):
+    return web.json_response({"error": message}, status=400)
+
+async def _read_json(request):
+    try:
+        payload = await request.json()
+    except ValueError:
+        return None
+    return payload if isinstance(payload, dict) else None
+
+async def handle_health(request):
+    return web.json_response({"status": "ok"})
+
+async def handle_stats(request):
+    return web.json_response({
+        "cache": request.app["cache"].stats(),
+        "enrichment": core.get_enrichment_metrics(),
+        "tiered_cache": get_tiered_cache().stats()
+    })
+
+async def handle_geocode(request):
+    payload = await _read_json(request)
+    if payload is None or not payload.get("location"):
+        return _bad_request("Request body must be a JSON object with a 'location'")
+
+    result = await core.geocode(payload["location"], request.app["gmaps"])
+    return web.json_response(core.to_dict(result))
+
+async def handle_recommendations(request):
+    payload = await _read_json(request)
+    if payload is None:
+        return _bad_request("Request body must be a JSON object")
+
+    category = payload.get("category")
+    location = payload.get("location")
+    coordinates = payload.get("coordinates") or {}
+    travel_style = payload.get("travel_style", "Any")
+    if not category or not location or "lat" not in coordinates or "lng" not in coordinates:
+        return _bad_request("'category', 'location' and 'coordinates' with 'lat' and 'lng' are required")
+
+    app = request.app
+    cache = app["cache"]
+    cache_key = core.recommendation_key(category, location, coordinates, travel_style)
+
+    fetched = []
+
+    def on_enriched(enhanced):
+        # A late LLM answer replaces the fallback descriptions for the next request
+        if fetched:
+            cache.set(cache_key, core.enriched_result(fetched[0], enhanced))
+
+    async def fetch(background=False):
+        # Nobody waits on a background refresh, so it gets no LLM deadline and skips the
+        # tiered cache so the refresh actually reaches the APIs
+        budgets = {**app["budgets"], "llm": None} if background else app["budgets"]
+        result = await core.recommend(
+            category,
+            location,
+            coordinates,
+            app["gmaps"],
+            app["llm"],
+            travel_style,
+            budgets=budgets,
+            on_enriched=on_enriched,
+            refresh=background
+        )
+        fetched.append(result)
+        return result
+
+    async def refresh():
+        result = await fetch(background=True)
+        # A refresh that lost its LLM descriptions keeps the cached entry instead of replacing it
+        return result if result.enriched else None
+
+    result = await cache.get_async(cache_key, fetch, refresh_loader=refresh)
+    return web.json_response(core.to_dict(result))
+
+async def handle_invalidate(request):
+    payload = await _read_json(request)
+    if payload is None:
+        return _bad_request("Request body must be a JSON object")
+
+    location = payload.get("location")
+    coordinates = payload.get("coordinates") or {}
+    if not location or "lat" not in coordinates or "lng" not in coordinates:
+        return _bad_request("'location' and 'coordinates' with 'lat' and 'lng' are required")
+    coordinates = {"lat": coordinates["lat"], "lng": coordinates["lng"]}
+    categories = [payload["category"]] if payload.get("category") else list(core.CATEGORY_MAPPING)
+    travel_styles = [payload["travel_style"]] if payload.get("travel_style") else ["Any", *core.PRICE_RANGES]
+
+    keys = [core.geocode.cache_key(location, None)]
+    for category in categories:
+        for travel_style in travel_styles:
+            keys.append(core.recommendation_key(category, location, coordinates, travel_style))
+            keys.append(core.search_places.cache_key(
+                category,
+                coordinates,
+                location,
+                None,
+                travel_style,
+                radius=core.RECOMMENDATION_RADIUS,
+                limit=core.RECOMMENDATION_LIMIT
+            ))
+
+    # Deleting from L2 and publishing to other nodes are blocking Redis calls. Invalidating a
+    # key also drops it from the stale-while-revalidate cache of this and every listening node.
+    tiered_cache = get_tiered_cache()
+    loop = asyncio.get_running_loop()
+    for key in keys:
+        await loop.run_in_executor(None, tiered_cache.invalidate, key)
+    return web.json_response({"invalidated": len(keys)})
+
+def main():
+    host = os.getenv("RECOMMENDATION_SERVICE_HOST", "127.0.0.1")
+    port = int(os.getenv("RECOMMENDATION_SERVICE_PORT", "8600"))
+    web.run_app(create_app(), host=host, port=port)
+
+if __name__ == "__main__":
+    main()
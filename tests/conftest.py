@@ -0,0 +1,84 @@
+import asyncio
+import json
+import time
+
+import pytest
+from langchain_core.messages import AIMessage
+
+from utils.tiered_cache import TieredCache, set_tiered_cache
+
+
+# Offline stand-in for googlemaps.Client with controllable latency and failures
+class FakeMaps:
+    """
+    latency maps a search type, "search" (any other search) or "details" to seconds per call
+    """
+
+    def __init__(self, places_per_search=3, fail=False):
+        self.places_per_search = places_per_search
+        self.fail = fail
+        self.latency = {}
+        self.calls = {"geocode": 0, "places": 0, "place": 0}
+
+    def geocode(self, address):
+        self.calls["geocode"] += 1
+        if self.fail:
+            raise RuntimeError("maps outage")
+        return [{"geometry": {"location": {"lat": 48.85, "lng": 2.35}}}]
+
+    def places(self, query, location=None, radius=None, type=None, **kwargs):
+        self.calls["places"] += 1
+        if self.fail:
+            raise RuntimeError("maps outage")
+        term = type or query
+        self._wait(term, "search")
+        return {"results": [
+            {
+                "place_id": f"{term}-{i}",
+                "name": f"{term} {i}",
+                "rating": 4.0 + i / 10,
+                "user_ratings_total": 100 * (i + 1),
+                "vicinity": f"{i} Main Street"
+            }
+            for i in range(self.places_per_search)
+        ]}
+
+    def place(self, place_id, fields=None):
+        self.calls["place"] += 1
+        self._wait("details", "details")
+        return {"result": {"website": f"https://example.com/{place_id}"}}
+
+    def _wait(self, term, kind):
+        # The client is called from worker threads, so a blocking sleep is what a real call looks like
+        time.sleep(self.latency.get(term, self.latency.get(kind, 0)))
+
+
+# Offline stand-in for the chat model; answers the recommendation prompt after delay seconds
+class FakeLLM:
+    def __init__(self, delay=0.0, response=None, error=None):
+        self.delay = delay
+        self.response = response
+        self.error = error
+        self.calls = 0
+
+    async def __call__(self, prompt_value):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        if self.response is not None:
+            return AIMessage(content=self.response)
+        text = prompt_value.to_string()
+        places = json.loads(text.split("Places data:", 1)[1].split("\n", 1)[0])
+        return AIMessage(content=json.dumps({"recommendations": [
+            {"place_id": place["place_id"], "name": place["name"], "description": "LLM description", "highlights": ["h"]}
+            for place in places
+        ]}))
+
+
+@pytest.fixture(autouse=True)
+def isolated_tiered_cache():
+    # Every test starts from an empty shared cache
+    set_tiered_cache(TieredCache())
+    yield
+    set_tiered_cache(None)
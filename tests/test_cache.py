@@ -0,0 +1,293 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from utils.cache import RecommendationCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_cache(clock, **kwargs):
+    options = {"soft_ttl": 10, "hard_ttl": 100, "jitter": 0, "clock": clock}
+    options.update(kwargs)
+    return RecommendationCache(**options)
+
+
+def wait_for_refreshes(cache, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while cache.stats()["refreshing"] and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert cache.stats()["refreshing"] == 0
+
+
+def counting_loader(prefix="value"):
+    calls = []
+
+    def loader():
+        calls.append(None)
+        return [f"{prefix}-{len(calls)}"]
+
+    return loader, calls
+
+
+def test_fresh_hits_do_not_reload():
+    clock = FakeClock()
+    cache = make_cache(clock)
+    loader, calls = counting_loader()
+
+    assert cache.get("key", loader) == ["value-1"]
+    clock.now = 9
+    assert cache.get("key", loader) == ["value-1"]
+
+    assert len(calls) == 1
+    stats = cache.stats()
+    assert stats["blocking_misses"] == 1
+    assert stats["fresh_hits"] == 1
+
+
+def test_stale_entry_is_served_and_refreshed_in_background():
+    clock = FakeClock()
+    cache = make_cache(clock)
+    loader, calls = counting_loader()
+    cache.get("key", loader)
+
+    clock.now = 11
+    assert cache.get("key", loader) == ["value-1"]
+    wait_for_refreshes(cache)
+    assert cache.get("key", loader) == ["value-2"]
+
+    stats = cache.stats()
+    assert stats["stale_serves"] == 1
+    assert stats["refreshes"] == 1
+    assert stats["blocking_misses"] == 1
+
+
+def test_only_one_refresh_runs_per_key():
+    clock = FakeClock()
+    cache = make_cache(clock)
+    release = threading.Event()
+    calls = []
+
+    def slow_loader():
+        calls.append(None)
+        if len(calls) > 1:
+            release.wait(2)
+        return ["value"]
+
+    cache.get("key", slow_loader)
+    clock.now = 11
+    for _ in range(5):
+        cache.get("key", slow_loader)
+    release.set()
+    wait_for_refreshes(cache)
+
+    assert len(calls) == 2
+    assert cache.stats()["stale_serves"] == 5
+
+
+def test_hard_ttl_blocks_on_reload():
+    clock = FakeClock()
+    cache = make_cache(clock)
+    loader, calls = counting_loader()
+    cache.get("key", loader)
+
+    clock.now = 100
+    assert cache.get("key", loader) == ["value-2"]
+    assert cache.stats()["blocking_misses"] == 2
+
+
+def test_jitter_keeps_soft_expiry_within_bounds():
+    clock = FakeClock()
+    cache = make_cache(clock, soft_ttl=100, hard_ttl=1000, jitter=0.2)
+    for i in range(50):
+        cache.set(i, ["value"])
+
+    soft_expiries = {entry["soft_expiry"] for entry in cache._entries.values()}
+    assert all(80 <= expiry <= 120 for expiry in soft_expiries)
+    assert len(soft_expiries) > 1
+
+
+def test_hard_ttl_must_not_be_below_soft_ttl():
+    with pytest.raises(ValueError):
+        RecommendationCache(soft_ttl=10, hard_ttl=5)
+
+
+def test_refresh_failure_keeps_stale_value():
+    clock = FakeClock()
+    cache = make_cache(clock)
+    cache.get("key", lambda: ["good"])
+
+    def failing_loader():
+        raise RuntimeError("maps outage")
+
+    clock.now = 11
+    assert cache.get("key", failing_loader) == ["good"]
+    wait_for_refreshes(cache)
+    assert cache.get("key", failing_loader) == ["good"]
+
+    assert cache.stats()["refresh_failures"] >= 1
+
+
+def test_empty_results_are_not_cached():
+    clock = FakeClock()
+    cache = make_cache(clock)
+    loader_calls = []
+
+    def empty_loader():
+        loader_calls.append(None)
+        return []
+
+    assert cache.get("key", empty_loader) == []
+    assert cache.get("key", empty_loader) == []
+
+    stats = cache.stats()
+    assert len(loader_calls) == 2
+    assert stats["entries"] == 0
+    assert stats["not_cached"] == 2
+
+
+def test_empty_refresh_keeps_previous_value():
+    clock = FakeClock()
+    cache = make_cache(clock)
+    cache.get("key", lambda: ["good"])
+
+    clock.now = 11
+    cache.get("key", lambda: [])
+    wait_for_refreshes(cache)
+
+    assert cache.get("key", lambda: []) == ["good"]
+    assert cache.stats()["refresh_failures"] == 1
+
+
+def test_max_entries_evicts_least_recently_used():
+    clock = FakeClock()
+    cache = make_cache(clock, max_entries=2)
+    cache.get("a", lambda: ["a"])
+    cache.get("b", lambda: ["b"])
+    cache.get("a", lambda: ["a"])
+    cache.get("c", lambda: ["c"])
+
+    assert set(cache._entries) == {"a", "c"}
+    assert cache.stats()["evictions"] == 1
+
+
+def test_key_locks_are_released_after_loading():
+    clock = FakeClock()
+    cache = make_cache(clock)
+    for i in range(10):
+        cache.get(f"location-{i}", lambda: ["value"])
+
+    assert cache.stats()["key_locks"] == 0
+
+
+def test_background_refresh_uses_refresh_loader():
+    clock = FakeClock()
+    cache = make_cache(clock)
+    cache.get("key", lambda: ["foreground"])
+
+    clock.now = 11
+    cache.get("key", lambda: ["foreground"], refresh_loader=lambda: ["background"])
+    wait_for_refreshes(cache)
+
+    assert cache.get("key", lambda: ["foreground"]) == ["background"]
+
+
+def test_late_value_is_not_overwritten_by_slower_load():
+    clock = FakeClock()
+    cache = make_cache(clock)
+
+    def loader_with_late_answer():
+        # The late LLM answer is stored while the load is still returning its fallback
+        cache.set("key", ["enriched"])
+        return ["fallback"]
+
+    assert cache.get("key", loader_with_late_answer) == ["enriched"]
+    assert cache.get("key", lambda: ["other"]) == ["enriched"]
+    assert cache.stats()["superseded"] == 1
+
+
+def test_refresh_does_not_overwrite_newer_value():
+    clock = FakeClock()
+    cache = make_cache(clock)
+    cache.get("key", lambda: ["fallback"])
+
+    def refresh_loader():
+        cache.set("key", ["enriched"])
+        return ["refreshed"]
+
+    clock.now = 11
+    cache.get("key", refresh_loader)
+    wait_for_refreshes(cache)
+
+    assert cache.get("key", lambda: ["other"]) == ["enriched"]
+    assert cache.stats()["superseded"] == 1
+
+
+def async_loader(value, calls, delay=0):
+    async def loader():
+        calls.append(None)
+        await asyncio.sleep(delay)
+        return [value]
+
+    return loader
+
+
+def test_async_misses_share_one_load():
+    clock = FakeClock()
+    cache = make_cache(clock)
+    calls = []
+    loader = async_loader("value", calls, delay=0.05)
+
+    async def run():
+        return await asyncio.gather(*(cache.get_async("key", loader) for _ in range(5)))
+
+    assert asyncio.run(run()) == [["value"]] * 5
+    assert len(calls) == 1
+    stats = cache.stats()
+    assert stats["blocking_misses"] == 1
+    assert stats["pending_loads"] == 0
+
+
+def test_async_load_failure_reaches_every_waiter():
+    clock = FakeClock()
+    cache = make_cache(clock)
+
+    async def failing_loader():
+        await asyncio.sleep(0.05)
+        raise RuntimeError("maps outage")
+
+    async def run():
+        return await asyncio.gather(*(cache.get_async("key", failing_loader) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert cache.stats()["pending_loads"] == 0
+
+
+def test_async_stale_entry_is_refreshed_on_the_loop():
+    clock = FakeClock()
+    cache = make_cache(clock)
+    calls = []
+
+    async def run():
+        await cache.get_async("key", async_loader("first", calls))
+        clock.now = 11
+        stale = await cache.get_async("key", async_loader("first", calls), refresh_loader=async_loader("second", calls))
+        # Let the refresh task finish
+        while cache.stats()["refreshing"]:
+            await asyncio.sleep(0.01)
+        return stale, await cache.get_async("key", async_loader("other", calls))
+
+    assert asyncio.run(run()) == (["first"], ["second"])
+    stats = cache.stats()
+    assert stats["stale_serves"] == 1
+    assert stats["refreshes"] == 1
+    assert len(calls) == 2
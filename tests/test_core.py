@@ -0,0 +1,189 @@
+import asyncio
+
+import pytest
+from conftest import FakeLLM, FakeMaps
+
+from utils import core
+
+PARIS = {"lat": 48.85, "lng": 2.35}
+
+
+def metric_changes(before):
+    after = core.get_enrichment_metrics()
+    return {name: after[name] - before[name] for name in after if after[name] != before[name]}
+
+
+def recommend(maps, llm, budgets=None, on_enriched=None, linger=0.0):
+    """Run recommend for food in Paris, keeping the loop alive for linger seconds afterwards"""
+    async def run():
+        result = await core.recommend("food", "Paris", PARIS, maps, llm, budgets=budgets, on_enriched=on_enriched)
+        await asyncio.sleep(linger)
+        return result
+
+    return asyncio.run(run())
+
+
+def search(maps, budgets):
+    return asyncio.run(core.search_places("food", PARIS, "Paris", maps, budgets=budgets))
+
+
+def test_run_sync_runs_coroutines_from_plain_threads():
+    result = core.run_sync(core.geocode("Paris", FakeMaps()))
+
+    assert result.location == {"lat": 48.85, "lng": 2.35}
+    assert result.errors == []
+
+
+def test_run_sync_refuses_to_block_the_core_loop():
+    async def nested():
+        with pytest.raises(RuntimeError, match="core event loop"):
+            core.run_sync(core.geocode("Paris", FakeMaps()))
+        return True
+
+    assert core.run_sync(nested())
+
+
+def test_geocode_failure_is_reported_not_raised():
+    result = asyncio.run(core.geocode("Paris", FakeMaps(fail=True)))
+
+    assert result.location is None
+    assert [error.stage for error in result.errors] == ["geocode"]
+
+
+def test_results_round_trip_through_dicts():
+    result = core.RecommendationResult(
+        [{"name": "Cafe"}],
+        [core.PipelineError("llm", "Error enhancing recommendations", "raw")],
+        enriched=True,
+        truncated=True
+    )
+
+    assert core.RecommendationResult.from_dict(core.to_dict(result)) == result
+
+
+def test_successful_results_are_served_from_the_tiered_cache():
+    maps = FakeMaps()
+    llm = FakeLLM()
+
+    first = recommend(maps, llm)
+    calls = dict(maps.calls)
+    second = recommend(maps, llm)
+
+    assert second == first
+    assert maps.calls == calls
+    assert llm.calls == 1
+
+
+def test_late_result_is_stored_in_the_tiered_cache():
+    maps = FakeMaps()
+    llm = FakeLLM(delay=0.1)
+    recommend(maps, llm, budgets={"llm": 0.02}, linger=0.3)
+
+    cached = recommend(maps, llm, budgets={"llm": 0.02})
+
+    assert cached.enriched
+    assert llm.calls == 1
+
+
+def test_llm_within_budget_enriches_places():
+    before = core.get_enrichment_metrics()
+
+    result = recommend(FakeMaps(), FakeLLM(), budgets={"llm": 1.0})
+
+    assert result.enriched
+    assert not result.errors
+    assert all(place["description"] == "LLM description" for place in result.places)
+    assert metric_changes(before) == {"llm_on_time": 1}
+
+
+def test_llm_past_budget_falls_back_then_delivers_late_result():
+    before = core.get_enrichment_metrics()
+    delivered = []
+
+    result = recommend(FakeMaps(), FakeLLM(delay=0.2), budgets={"llm": 0.02}, on_enriched=delivered.append, linger=0.4)
+
+    assert not result.enriched
+    assert all(place["description_source"] == "simple" for place in result.places)
+    assert len(delivered) == 1
+    assert [place["place_id"] for place in delivered[0]] == [place["place_id"] for place in result.places]
+    assert all(place["description"] == "LLM description" for place in delivered[0])
+    # The late answer works on its own copy, so the returned fallback is left untouched
+    assert all(place["description_source"] == "simple" for place in result.places)
+    assert metric_changes(before) == {"llm_fallback": 1, "llm_upgraded": 1}
+
+
+def test_late_llm_failure_is_counted_and_not_delivered():
+    before = core.get_enrichment_metrics()
+    delivered = []
+
+    llm = FakeLLM(delay=0.1, error=RuntimeError("LLM outage"))
+    result = recommend(FakeMaps(), llm, budgets={"llm": 0.02}, on_enriched=delivered.append, linger=0.3)
+
+    assert not result.enriched
+    assert delivered == []
+    assert metric_changes(before) == {"llm_fallback": 1, "llm_failed": 1}
+
+
+def test_llm_error_is_reported_on_the_result():
+    before = core.get_enrichment_metrics()
+
+    result = recommend(FakeMaps(), FakeLLM(error=RuntimeError("LLM outage")))
+
+    assert not result.enriched
+    assert result.places
+    assert [(error.stage, error.message) for error in result.errors] == [
+        ("llm", "Error enhancing recommendations: LLM outage")
+    ]
+    assert metric_changes(before) == {"llm_failed": 1}
+
+
+def test_unparseable_llm_response_keeps_the_raw_text():
+    result = recommend(FakeMaps(), FakeLLM(response="not json"))
+
+    assert not result.enriched
+    assert result.errors[0].stage == "llm"
+    assert result.errors[0].detail == "not json"
+
+
+def test_search_budget_drops_slow_searches():
+    before = core.get_enrichment_metrics()
+    maps = FakeMaps(places_per_search=3)
+    maps.latency = {"bar": 0.5}
+
+    result = search(maps, {"search": 0.2})
+
+    assert result.truncated
+    assert result.places
+    assert not any(place["place_id"].startswith("bar-") for place in result.places)
+    assert metric_changes(before) == {"search_overruns": 1}
+
+
+def test_search_budget_waits_for_the_first_results():
+    maps = FakeMaps(places_per_search=5)
+    maps.latency = {"search": 0.5, "cafe": 0.1}
+
+    result = search(maps, {"search": 0.01})
+
+    assert result.truncated
+    assert result.places
+    assert all(place["place_id"].startswith("cafe-") for place in result.places)
+
+
+def test_details_budget_keeps_basic_place_data():
+    before = core.get_enrichment_metrics()
+    maps = FakeMaps()
+    maps.latency = {"details": 0.5}
+
+    result = search(maps, {"details": 0.05})
+
+    assert result.truncated
+    assert result.places
+    assert not any("website" in place for place in result.places)
+    assert metric_changes(before) == {"details_overruns": 1}
+
+
+def test_unbudgeted_search_is_complete():
+    result = search(FakeMaps(), None)
+
+    assert not result.truncated
+    assert all(place["website"] for place in result.places)
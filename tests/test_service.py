@@ -0,0 +1,177 @@
+import asyncio
+
+from aiohttp.test_utils import TestClient, TestServer
+from conftest import FakeLLM, FakeMaps
+
+import service
+from utils import core
+from utils.cache import RecommendationCache
+from utils.tiered_cache import get_tiered_cache
+
+PARIS = {"lat": 48.85, "lng": 2.35}
+REQUEST = {"category": "food", "location": "Paris, France", "coordinates": PARIS, "travel_style": "Any"}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_app(maps=None, llm=None, clock=None, budgets=None):
+    cache = RecommendationCache(soft_ttl=10, hard_ttl=100, jitter=0, should_cache=service.servable, clock=clock or FakeClock())
+    return service.create_app(maps or FakeMaps(), llm or FakeLLM(), cache, budgets or {"llm": None})
+
+
+def serve(app, scenario):
+    """Run scenario(client) against app on a fresh event loop"""
+    async def run():
+        async with TestClient(TestServer(app)) as client:
+            return await scenario(client)
+
+    return asyncio.run(run())
+
+
+async def wait_for_refreshes(cache):
+    while cache.stats()["refreshing"]:
+        await asyncio.sleep(0.01)
+
+
+def test_outage_results_are_not_cached():
+    maps = FakeMaps(fail=True)
+    app = make_app(maps=maps)
+
+    async def scenario(client):
+        first = await (await client.post("/recommendations", json=REQUEST)).json()
+        await client.post("/recommendations", json=REQUEST)
+        return first
+
+    result = serve(app, scenario)
+
+    assert result["places"] == []
+    assert result["errors"]
+    assert app["cache"].stats()["entries"] == 0
+    assert app["cache"].stats()["blocking_misses"] == 2
+
+
+def test_refresh_without_llm_keeps_enriched_entry():
+    clock = FakeClock()
+    llm = FakeLLM()
+    app = make_app(llm=llm, clock=clock)
+
+    async def scenario(client):
+        first = await (await client.post("/recommendations", json=REQUEST)).json()
+        llm.error = RuntimeError("LLM outage")
+        clock.now = 11
+        stale = await (await client.post("/recommendations", json=REQUEST)).json()
+        await wait_for_refreshes(app["cache"])
+        after = await (await client.post("/recommendations", json=REQUEST)).json()
+        return first, stale, after
+
+    first, stale, after = serve(app, scenario)
+
+    assert first["enriched"]
+    assert stale["enriched"]
+    assert after == first
+    stats = app["cache"].stats()
+    assert stats["refresh_failures"] == 1
+    assert stats["refreshes"] == 0
+    assert llm.calls == 2
+
+
+def test_health():
+    async def scenario(client):
+        response = await client.get("/health")
+        return response.status, await response.json()
+
+    assert serve(make_app(), scenario) == (200, {"status": "ok"})
+
+
+def test_geocode():
+    async def scenario(client):
+        missing = await client.post("/geocode", json={})
+        found = await client.post("/geocode", json={"location": "Paris, France"})
+        return missing.status, await found.json()
+
+    status, result = serve(make_app(), scenario)
+
+    assert status == 400
+    assert result == {"location": PARIS, "errors": []}
+
+
+def test_recommendations_reject_invalid_requests():
+    async def scenario(client):
+        not_json = await client.post("/recommendations", data="category=food")
+        not_object = await client.post("/recommendations", json=["food"])
+        no_coordinates = await client.post("/recommendations", json={**REQUEST, "coordinates": {"lat": 1}})
+        return [response.status for response in (not_json, not_object, no_coordinates)]
+
+    maps = FakeMaps()
+    assert serve(make_app(maps=maps), scenario) == [400, 400, 400]
+    assert maps.calls["places"] == 0
+
+
+def test_late_enrichment_keeps_the_truncated_flag():
+    maps = FakeMaps()
+    maps.latency = {"details": 0.3}
+    app = make_app(maps=maps, llm=FakeLLM(delay=0.1), budgets={"llm": 0.05, "details": 0.02})
+
+    async def scenario(client):
+        first = await (await client.post("/recommendations", json=REQUEST)).json()
+        await asyncio.sleep(0.5)
+        upgraded = await (await client.post("/recommendations", json=REQUEST)).json()
+        return first, upgraded
+
+    first, upgraded = serve(app, scenario)
+
+    assert (first["enriched"], first["truncated"]) == (False, True)
+    assert (upgraded["enriched"], upgraded["truncated"]) == (True, True)
+    assert [place["place_id"] for place in upgraded["places"]] == [place["place_id"] for place in first["places"]]
+
+
+def test_invalidate_drops_every_cached_result_for_the_location():
+    maps = FakeMaps()
+    app = make_app(maps=maps)
+    tiered_cache = get_tiered_cache()
+
+    async def scenario(client):
+        await client.post("/geocode", json={"location": REQUEST["location"]})
+        await client.post("/recommendations", json=REQUEST)
+        cached_keys = set(tiered_cache.l1._entries)
+        response = await client.post("/invalidate", json={
+            "location": REQUEST["location"],
+            "coordinates": PARIS,
+            "category": "food",
+            "travel_style": "Any"
+        })
+        return cached_keys, await response.json()
+
+    cached_keys, result = serve(app, scenario)
+
+    # The keys /invalidate builds are the ones the pipeline wrote
+    assert cached_keys == {
+        core.geocode.cache_key(REQUEST["location"], None),
+        core.recommendation_key("food", REQUEST["location"], PARIS, "Any"),
+        core.search_places.cache_key(
+            "food", PARIS, REQUEST["location"], None, "Any",
+            radius=core.RECOMMENDATION_RADIUS, limit=core.RECOMMENDATION_LIMIT
+        )
+    }
+    assert result == {"invalidated": 3}
+    assert len(tiered_cache.l1) == 0
+    assert app["cache"].stats()["entries"] == 0
+
+
+def test_invalidate_covers_every_category_and_style_by_default():
+    async def scenario(client):
+        missing = await client.post("/invalidate", json={"location": "Paris, France"})
+        everything = await client.post("/invalidate", json={"location": "Paris, France", "coordinates": PARIS})
+        return missing.status, await everything.json()
+
+    status, result = serve(make_app(), scenario)
+
+    styles = 1 + len(core.PRICE_RANGES)
+    assert status == 400
+    assert result == {"invalidated": 1 + 2 * len(core.CATEGORY_MAPPING) * styles}
@@ -0,0 +1,213 @@
+import asyncio
+import time
+
+import pytest
+
+from utils.cache import RecommendationCache
+from utils.tiered_cache import (
+    CACHE_SCHEMA_VERSION,
+    InMemoryRedis,
+    LRUCache,
+    TieredCache,
+    deserialize,
+    make_key,
+    serialize,
+    set_tiered_cache,
+    tiered_cached
+)
+
+
+@pytest.fixture
+def tiered_cache():
+    cache = TieredCache(l2=InMemoryRedis())
+    set_tiered_cache(cache)
+    yield cache
+    set_tiered_cache(None)
+
+
+def wait_for(condition, timeout=3.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert condition()
+
+
+def test_serialize_round_trip():
+    value = {"places": [{"name": "Café", "rating": 4.5, "types": ["cafe"]}], "enriched": True}
+    assert deserialize(serialize(value)) == value
+
+
+def test_keys_are_versioned_and_ignore_argument_order():
+    key = make_key("places", {"category": "food", "location": "Paris"})
+    assert key.startswith(f"intellitravel:v{CACHE_SCHEMA_VERSION}:places:")
+    assert key == make_key("places", {"location": "Paris", "category": "food"})
+    assert key != make_key("geocode", {"category": "food", "location": "Paris"})
+
+
+def test_l2_hit_is_promoted_to_l1():
+    server = InMemoryRedis()
+    writer = TieredCache(l2=server)
+    reader = TieredCache(l2=server)
+    writer.set("key", {"value": 1}, ttl=60)
+
+    assert reader.get("key") == (True, {"value": 1})
+    assert reader.get("key") == (True, {"value": 1})
+
+    stats = reader.stats()
+    assert stats["l2_hits"] == 1
+    assert stats["l1_hits"] == 1
+    assert stats["l1_entries"] == 1
+
+
+def test_invalidation_reaches_other_nodes():
+    server = InMemoryRedis()
+    first = TieredCache(l1=LRUCache(), l2=server, invalidation=True)
+    second = TieredCache(l1=LRUCache(), l2=server, invalidation=True)
+    first.set("key", "value", ttl=60)
+    assert second.get("key") == (True, "value")
+
+    first.invalidate("key")
+
+    wait_for(lambda: second.stats()["invalidations_received"] >= 1)
+    assert second.get("key") == (False, None)
+    assert first.get("key") == (False, None)
+
+
+def test_decorator_caches_async_results_that_pass_should_cache(tiered_cache):
+    calls = []
+
+    @tiered_cached("test", 60, ignore=("client",), should_cache=lambda result: result["complete"])
+    async def lookup(name, client, complete=True):
+        calls.append(name)
+        return {"name": name, "complete": complete}
+
+    assert asyncio.run(lookup("a", object())) == {"name": "a", "complete": True}
+    assert asyncio.run(lookup("a", object())) == {"name": "a", "complete": True}
+    asyncio.run(lookup("b", object(), complete=False))
+    asyncio.run(lookup("b", object(), complete=False))
+
+    assert calls == ["a", "b", "b"]
+    assert lookup.cache_key("a", None) == lookup.cache_key("a", object())
+
+
+def test_decorator_encodes_and_decodes_results(tiered_cache):
+    class Result:
+        def __init__(self, value):
+            self.value = value
+
+    @tiered_cached("test", 60, should_cache=lambda result: True, encode=lambda result: result.value, decode=Result)
+    async def lookup(name):
+        return Result(name.upper())
+
+    asyncio.run(lookup("a"))
+    cached = asyncio.run(lookup("a"))
+
+    assert isinstance(cached, Result)
+    assert cached.value == "A"
+
+
+def test_refresh_skips_the_lookup_and_overwrites(tiered_cache):
+    calls = []
+
+    @tiered_cached("test", 60)
+    def lookup(name):
+        calls.append(name)
+        return f"{name}-{len(calls)}"
+
+    assert lookup("a") == "a-1"
+    assert lookup("a") == "a-1"
+    assert lookup("a", refresh=True) == "a-2"
+    assert lookup("a") == "a-2"
+    assert lookup.cache_key("a") == lookup.cache_key("a", refresh=True)
+
+
+def test_refresh_is_passed_to_functions_that_accept_it(tiered_cache):
+    seen = []
+
+    @tiered_cached("test", 60)
+    async def lookup(name, refresh=False):
+        seen.append(refresh)
+        return name
+
+    asyncio.run(lookup("a"))
+    asyncio.run(lookup("a", refresh=True))
+
+    assert seen == [False, True]
+
+
+def test_late_result_is_stored_under_the_same_key(tiered_cache):
+    delivered = []
+
+    @tiered_cached(
+        "test",
+        60,
+        ignore=("on_late",),
+        should_cache=lambda result: result["enriched"],
+        late_result_arg="on_late",
+        late_result=lambda original, late: {**original, "places": late, "enriched": True}
+    )
+    async def lookup(name, on_late=None):
+        # Deliver the late value after the original result has been returned
+        asyncio.get_running_loop().call_later(0.01, on_late, [f"{name}-late"])
+        return {"places": [f"{name}-fallback"], "errors": [], "enriched": False}
+
+    async def first_call():
+        result = await lookup("a", on_late=delivered.append)
+        await asyncio.sleep(0.05)
+        return result
+
+    assert asyncio.run(first_call())["enriched"] is False
+    assert delivered == [["a-late"]]
+
+    wait_for(lambda: tiered_cache.get(lookup.cache_key("a"))[0])
+    assert asyncio.run(lookup("a")) == {"places": ["a-late"], "errors": [], "enriched": True}
+
+
+def test_invalidation_reaches_listening_caches_on_every_node():
+    server = InMemoryRedis()
+    first = TieredCache(l2=server, invalidation=True)
+    second = TieredCache(l2=server, invalidation=True)
+    local, remote = RecommendationCache(), RecommendationCache()
+    first.add_invalidation_listener(local.invalidate)
+    second.add_invalidation_listener(remote.invalidate)
+    local.set("key", ["local"])
+    remote.set("key", ["remote"])
+
+    first.invalidate("key")
+
+    assert local.stats()["entries"] == 0
+    wait_for(lambda: remote.stats()["entries"] == 0)
+
+
+def test_removed_listener_is_not_called():
+    cache = TieredCache()
+    invalidated = []
+    cache.add_invalidation_listener(invalidated.append)
+    cache.invalidate("a")
+    cache.remove_invalidation_listener(invalidated.append)
+    cache.invalidate("b")
+
+    assert invalidated == ["a"]
+
+
+def test_promoted_entry_does_not_outlive_l2():
+    server = InMemoryRedis()
+    writer = TieredCache(l2=server)
+    reader = TieredCache(l2=server)
+    writer.set("key", "value", ttl=1)
+
+    assert reader.get("key", ttl=3600) == (True, "value")
+
+    _, expires_at = reader.l1._entries["key"]
+    assert expires_at - time.monotonic() <= 1
+
+
+def test_entry_without_l2_expiry_is_promoted_for_ttl():
+    server = InMemoryRedis()
+    TieredCache(l2=server).set("key", "value")
+    reader = TieredCache(l2=server)
+
+    reader.get("key", ttl=60)
+
+    _, expires_at = reader.l1._entries["key"]
+    assert 59 <= expires_at - time.monotonic() <= 60
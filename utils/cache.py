@@ -0,0 +1,266 @@
+import asyncio
+import random
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+# Shared stale-while-revalidate cache for recommendation results
+class RecommendationCache:
+    """
+    Serve cached results immediately and refresh them in the background once they go stale.
+
+    Entries younger than the soft TTL are served as fresh hits. Between the soft and the hard
+    TTL the cached value is still returned right away, while a background worker re-runs the
+    loader and swaps the new value in. Past the hard TTL (or on a first request) the caller
+    blocks on the loader. The soft TTL is jittered per entry so that results stored together
+    do not all come up for refresh at the same moment.
+
+    Values rejected by should_cache (by default empty results, which usually mean an upstream
+    outage) are returned to the caller but never stored, and at most max_entries entries are
+    kept, evicting the least recently used.
+
+    Every store bumps a per-key version. A load only stores its result if the key has not been
+    written since the load started, so a newer value that lands first (e.g. LLM descriptions
+    delivered late through set) is never overwritten by the slower load's older result.
+
+    get takes plain functions and blocks the calling thread; get_async takes coroutine
+    functions, waits on a per-key future and runs refreshes as tasks on the running loop, so
+    an asyncio server needs no thread per request.
+    """
+
+    def __init__(self, soft_ttl=600, hard_ttl=3600, jitter=0.1, max_entries=1024, max_workers=4,
+                 should_cache=bool, clock=time.monotonic):
+        if hard_ttl < soft_ttl:
+            raise ValueError("hard_ttl must be greater than or equal to soft_ttl")
+        self.soft_ttl = soft_ttl
+        self.hard_ttl = hard_ttl
+        self.jitter = jitter
+        self.max_entries = max_entries
+        self.should_cache = should_cache
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._key_locks = {}
+        self._pending_loads = {}
+        self._refresh_tasks = set()
+        self._refreshing = set()
+        self._version = 0
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="recommendation-refresh")
+        self._stats = {
+            "fresh_hits": 0,
+            "stale_serves": 0,
+            "blocking_misses": 0,
+            "refreshes": 0,
+            "refresh_failures": 0,
+            "not_cached": 0,
+            "superseded": 0,
+            "evictions": 0,
+        }
+
+    def get(self, key, loader, refresh_loader=None):
+        """
+        Return the cached value for key, calling loader on a miss or scheduling a refresh when stale
+
+        Background refreshes call refresh_loader when given, so they can use settings that would
+        be too slow for a user who is waiting, and fall back to loader otherwise.
+        """
+        refresh_loader = refresh_loader or loader
+        entry = self._lookup(key, refresh_loader)
+        if entry is not None:
+            return entry["value"]
+
+        # Only one caller per key pays for the blocking load; the others wait and reuse it
+        key_lock = self._key_lock(key)
+        try:
+            with key_lock:
+                entry = self._lookup(key, refresh_loader, count=False)
+                if entry is not None:
+                    return entry["value"]
+
+                self._increment("blocking_misses")
+                version = self._key_version(key)
+                value = loader()
+                if not self.set(key, value, expected_version=version):
+                    # Something newer was stored while loading; serve that instead
+                    entry = self._lookup(key, refresh_loader, count=False)
+                    if entry is not None:
+                        return entry["value"]
+                return value
+        finally:
+            with self._lock:
+                if self._key_locks.get(key) is key_lock and not key_lock.locked():
+                    del self._key_locks[key]
+
+    async def get_async(self, key, loader, refresh_loader=None):
+        """
+        Return the cached value for key, awaiting loader() on a miss or scheduling a refresh when stale
+
+        The asyncio counterpart of get: loader and refresh_loader are coroutine functions, and
+        callers that miss while a load for the same key is in flight await that load instead of
+        starting another one. Must be called from the event loop that runs the loaders.
+        """
+        refresh_loader = refresh_loader or loader
+        entry = self._lookup(key, refresh_loader, schedule=self._schedule_async_refresh)
+        if entry is not None:
+            return entry["value"]
+
+        pending = self._pending_loads.get(key)
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+        pending = asyncio.get_running_loop().create_future()
+        self._pending_loads[key] = pending
+        try:
+            self._increment("blocking_misses")
+            version = self._key_version(key)
+            value = await loader()
+            if not self.set(key, value, expected_version=version):
+                # Something newer was stored while loading; serve that instead
+                entry = self._lookup(key, refresh_loader, count=False, schedule=self._schedule_async_refresh)
+                if entry is not None:
+                    value = entry["value"]
+            pending.set_result(value)
+            return value
+        except asyncio.CancelledError:
+            pending.cancel()
+            raise
+        except Exception as e:
+            pending.set_exception(e)
+            # Waiters get the exception; don't warn about it when there are none
+            pending.exception()
+            raise
+        finally:
+            del self._pending_loads[key]
+
+    def set(self, key, value, expected_version=None):
+        """
+        Store value under key, replacing any existing entry in a single step
+
+        With expected_version, the value is only stored if the key's version still matches.
+        Returns False when the value was not stored.
+        """
+        if not self.should_cache(value):
+            self._increment("not_cached")
+            return False
+
+        now = self._clock()
+        soft_ttl = self.soft_ttl * (1 + random.uniform(-self.jitter, self.jitter))
+        entry = {
+            "value": value,
+            "soft_expiry": now + min(soft_ttl, self.hard_ttl),
+            "hard_expiry": now + self.hard_ttl,
+        }
+        with self._lock:
+            if expected_version is not None and self._version_of(key) != expected_version:
+                self._stats["superseded"] += 1
+                return False
+            self._version += 1
+            entry["version"] = self._version
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+        return True
+
+    def invalidate(self, key=None):
+        """Drop a single entry, or every entry when no key is given"""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def stats(self):
+        """Return a snapshot of the hit, stale-serve and refresh counters"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+            stats["refreshing"] = len(self._refreshing)
+            stats["key_locks"] = len(self._key_locks)
+            stats["pending_loads"] = len(self._pending_loads)
+        return stats
+
+    def _lookup(self, key, loader, count=True, schedule=None):
+        """
+        Return a servable entry, scheduling a refresh if it is past its soft TTL
+
+        schedule(key, loader, version) starts the refresh; by default it runs on the worker pool.
+        """
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if now >= entry["hard_expiry"]:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            if now < entry["soft_expiry"]:
+                if count:
+                    self._stats["fresh_hits"] += 1
+                return entry
+            if count:
+                self._stats["stale_serves"] += 1
+            refresh_needed = key not in self._refreshing
+            if refresh_needed:
+                self._refreshing.add(key)
+        if refresh_needed:
+            if schedule is None:
+                self._executor.submit(self._refresh, key, loader, entry["version"])
+            else:
+                schedule(key, loader, entry["version"])
+        return entry
+
+    def _refresh(self, key, loader, version):
+        """Re-run the loader for a stale entry and swap in the result"""
+        try:
+            self._store_refresh(key, loader(), version)
+        except Exception:
+            # Keep serving the stale value until the hard TTL; the next stale read retries
+            self._increment("refresh_failures")
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def _schedule_async_refresh(self, key, loader, version):
+        task = asyncio.ensure_future(self._refresh_async(key, loader, version))
+        self._refresh_tasks.add(task)
+        task.add_done_callback(self._refresh_tasks.discard)
+
+    async def _refresh_async(self, key, loader, version):
+        """Await the loader for a stale entry and swap in the result"""
+        try:
+            self._store_refresh(key, await loader(), version)
+        except Exception:
+            self._increment("refresh_failures")
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def _store_refresh(self, key, value, version):
+        if not self.should_cache(value):
+            # An empty refresh keeps the last good value instead of replacing it
+            self._increment("refresh_failures")
+        elif self.set(key, value, expected_version=version):
+            self._increment("refreshes")
+
+    def _version_of(self, key):
+        # Caller holds self._lock
+        entry = self._entries.get(key)
+        return entry["version"] if entry is not None else 0
+
+    def _key_version(self, key):
+        with self._lock:
+            return self._version_of(key)
+
+    def _key_lock(self, key):
+        with self._lock:
+            if key not in self._key_locks:
+                self._key_locks[key] = threading.Lock()
+            return self._key_locks[key]
+
+    def _increment(self, counter):
+        with self._lock:
+            self._stats[counter] += 1
@@ -0,0 +1,707 @@
+"""
+UI-free recommendation pipeline: geocode -> search -> details -> rank -> enrich
+
+Everything here is async and reports problems as PipelineError values on the result objects
+instead of writing to a UI, so the same code backs the Streamlit app (through run_sync) and
+the HTTP service in service.py.
+"""
+import asyncio
+import copy
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from langchain.prompts import PromptTemplate
+from utils.tiered_cache import tiered_cached
+
+# Create category mapping for proper search types
+CATEGORY_MAPPING = {
+    "food": {
+        "types": ["restaurant", "cafe", "bakery", "bar", "meal_takeaway", "meal_delivery"],
+        "keywords": ["food", "dining", "restaurants", "eat", "cuisine"]
+    },
+    "attractions": {
+        "types": ["tourist_attraction", "museum", "art_gallery", "aquarium", "zoo", "landmark"],
+        "keywords": ["sightseeing", "landmark", "tourist", "attractions", "visit"]
+    },
+    "activities": {
+        "types": ["amusement_park", "movie_theater", "bowling_alley", "stadium", "park", "spa",
+                 "gym", "shopping_mall", "night_club", "casino"],
+        "keywords": ["activity", "fun", "entertainment", "experience", "adventure"]
+    },
+    "shopping": {
+        "types": ["shopping_mall", "department_store", "clothing_store", "electronics_store", "jewelry_store"],
+        "keywords": ["shopping", "store", "mall", "buy", "shop"]
+    },
+    "nightlife": {
+        "types": ["night_club", "bar", "movie_theater", "casino"],
+        "keywords": ["nightlife", "night", "club", "entertainment", "evening"]
+    },
+    "nature": {
+        "types": ["park", "campground", "natural_feature", "beach"],
+        "keywords": ["nature", "outdoor", "park", "hiking", "beach"]
+    }
+}
+
+# Price levels accepted for each travel style
+PRICE_RANGES = {
+    "Budget": [0, 1],
+    "Mid-range": [1, 2],
+    "Luxury": [2, 3, 4]
+}
+
+# Fields requested from the Place Details API
+DETAIL_FIELDS = [
+    'name', 'rating', 'user_ratings_total', 'formatted_address',
+    'formatted_phone_number', 'website', 'opening_hours',
+    'price_level', 'review', 'photo', 'type', 'url'
+]
+
+# Maximum number of Place Details requests in flight per search
+DETAILS_CONCURRENCY = 5
+
+# How long results are shared between nodes through the tiered cache (seconds); place
+# coordinates rarely change, so geocoding results are kept for a week
+GEOCODE_CACHE_TTL = 7 * 24 * 3600
+PLACES_CACHE_TTL = 3600
+RECOMMENDATIONS_CACHE_TTL = 3600
+
+# Search radius in meters and number of places per recommendation request
+RECOMMENDATION_RADIUS = 5000
+RECOMMENDATION_LIMIT = 10
+
+# Per-stage time budgets in seconds; None means the stage runs to completion
+DEFAULT_STAGE_BUDGETS = {
+    "search": None,
+    "details": None,
+    "llm": None
+}
+
+# A problem in one pipeline stage, reported instead of raised
+@dataclass
+class PipelineError:
+    stage: str
+    message: str
+    detail: str = None
+
+@dataclass
+class GeocodeResult:
+    location: dict = None
+    errors: list = field(default_factory=list)
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data.get("location"), [PipelineError(**error) for error in data.get("errors", [])])
+
+@dataclass
+class SearchResult:
+    places: list = field(default_factory=list)
+    errors: list = field(default_factory=list)
+    # True when a stage ran out of budget and some searches or details were dropped
+    truncated: bool = False
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            data.get("places", []),
+            [PipelineError(**error) for error in data.get("errors", [])],
+            data.get("truncated", False)
+        )
+
+@dataclass
+class RecommendationResult:
+    places: list = field(default_factory=list)
+    errors: list = field(default_factory=list)
+    # True when the places carry LLM descriptions rather than the simple fallback
+    enriched: bool = False
+    # True when the search behind these places ran out of budget
+    truncated: bool = False
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            data.get("places", []),
+            [PipelineError(**error) for error in data.get("errors", [])],
+            data.get("enriched", False),
+            data.get("truncated", False)
+        )
+
+def to_dict(result):
+    """Convert a result object into plain JSON-serializable data"""
+    return asdict(result)
+
+# Raised when the LLM answers with something that is not valid JSON
+class LLMResponseError(ValueError):
+    def __init__(self, message, response):
+        super().__init__(message)
+        self.response = response
+
+# Counters for the deadline-driven enrichment path
+_enrichment_metrics = {
+    "llm_on_time": 0,
+    "llm_fallback": 0,
+    "llm_upgraded": 0,
+    "llm_failed": 0,
+    "search_overruns": 0,
+    "details_overruns": 0
+}
+_metrics_lock = threading.Lock()
+
+def _record_metric(name):
+    with _metrics_lock:
+        _enrichment_metrics[name] += 1
+
+def get_enrichment_metrics():
+    """Return a snapshot of how often each stage met or missed its budget"""
+    with _metrics_lock:
+        return dict(_enrichment_metrics)
+
+def budgets_from_env():
+    """Read per-stage budgets from SEARCH_/DETAILS_/LLM_BUDGET_SECONDS; the LLM budget defaults to 5 seconds"""
+    def budget(name, default=None):
+        value = os.getenv(name, default)
+        return float(value) if value else None
+
+    return {
+        "search": budget("SEARCH_BUDGET_SECONDS"),
+        "details": budget("DETAILS_BUDGET_SECONDS"),
+        "llm": budget("LLM_BUDGET_SECONDS", "5")
+    }
+
+# Threads for blocking Google Maps calls. One recommendation request issues 6-10 searches and up
+# to 10 Place Details lookups, so this caps how many requests make progress at once; the
+# asyncio default of min(32, cpu + 4) threads would be saturated by a handful of requests.
+MAPS_WORKERS = int(os.getenv("MAPS_WORKERS", "64"))
+
+def configure_executor(loop):
+    """Install a default executor sized for blocking Maps calls on loop"""
+    loop.set_default_executor(ThreadPoolExecutor(max_workers=MAPS_WORKERS, thread_name_prefix="maps"))
+
+# Event loop that runs pipelines for synchronous callers
+_loop = None
+_loop_lock = threading.Lock()
+
+# Enrichment tasks that outlived their deadline; held so they are not garbage collected
+_background_tasks = set()
+
+def use_event_loop(loop):
+    """
+    Run pipelines started through run_sync on an existing loop, e.g. the HTTP service's
+
+    The caller is responsible for sizing that loop's default executor (see configure_executor).
+    """
+    global _loop
+    with _loop_lock:
+        _loop = loop
+
+def _get_loop():
+    global _loop
+    with _loop_lock:
+        if _loop is None or _loop.is_closed():
+            _loop = asyncio.new_event_loop()
+            configure_executor(_loop)
+            threading.Thread(target=_loop.run_forever, name="recommendation-core", daemon=True).start()
+        return _loop
+
+def run_sync(coro):
+    """Run a pipeline coroutine on the shared core loop and wait for its result"""
+    loop = _get_loop()
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    if running is loop:
+        coro.close()
+        raise RuntimeError("run_sync cannot be called from the core event loop; await the coroutine instead")
+    return asyncio.run_coroutine_threadsafe(coro, loop).result()
+
+# Function to geocode location
+@tiered_cached(
+    "geocode",
+    GEOCODE_CACHE_TTL,
+    ignore=("gmaps",),
+    should_cache=lambda result: result.location is not None and not result.errors,
+    encode=to_dict,
+    decode=GeocodeResult.from_dict
+)
+async def geocode(location_name, gmaps):
+    """Convert location name to coordinates"""
+    try:
+        geocode_result = await asyncio.to_thread(gmaps.geocode, location_name)
+    except Exception as e:
+        return GeocodeResult(errors=[PipelineError("geocode", f"Error geocoding location: {str(e)}")])
+
+    if geocode_result:
+        return GeocodeResult(location=geocode_result[0]['geometry']['location'])
+    return GeocodeResult()
+
+async def _collect(tasks, budget, stage):
+    """
+    Wait for tasks up to budget seconds and return the places from the finished ones, and
+    whether any were cut off
+
+    Unfinished tasks are cancelled once the budget is spent, unless nothing has come back yet,
+    in which case the first results are still awaited.
+    """
+    if not tasks:
+        return [], False
+
+    done, pending = await asyncio.wait(tasks, timeout=max(budget, 0) if budget is not None else None)
+    while pending and not any(task.result() for task in done):
+        more, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        done |= more
+
+    if pending:
+        _record_metric(f"{stage}_overruns")
+        for task in pending:
+            task.cancel()
+
+    # Keep the order the searches were issued in
+    return [place for task in tasks if task in done for place in task.result()], bool(pending)
+
+# Enhanced place search with category intelligence and travel style filtering
+@tiered_cached(
+    "places",
+    PLACES_CACHE_TTL,
+    ignore=("gmaps", "budgets"),
+    should_cache=lambda result: bool(result.places) and not result.errors and not result.truncated,
+    encode=to_dict,
+    decode=SearchResult.from_dict
+)
+async def search_places(category, location_coords, location_name, gmaps, travel_style="Any", radius=5000, limit=15, budgets=None):
+    """
+    Search every type in the category concurrently, rank the results and fetch details for the top ones
+
+    When budgets sets a "search" or "details" limit, searches still running are dropped or the
+    remaining places are returned without details once that stage runs out of time, and the
+    result is marked truncated. Pass refresh=True to skip the tiered cache and overwrite it.
+    """
+    budgets = {**DEFAULT_STAGE_BUDGETS, **(budgets or {})}
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    errors = []
+
+    # Get category information
+    if category.lower() in CATEGORY_MAPPING:
+        category_info = CATEGORY_MAPPING[category.lower()]
+        search_types = category_info["types"]
+        keywords = category_info["keywords"]
+    else:
+        # Default to generic search if category not found
+        search_types = [category.lower()]
+        keywords = [category.lower()]
+
+    # Adjust query based on travel style
+    style_keyword = ""
+    if travel_style != "Any":
+        style_keyword = f"{travel_style.lower()} "
+
+    async def search(term, search_type, **query):
+        try:
+            result = await asyncio.to_thread(gmaps.places, location=location_coords, radius=radius, **query)
+        except Exception as e:
+            errors.append(PipelineError("search", f"Error searching for {term}: {str(e)}"))
+            return []
+
+        places = result.get('results') or []
+        for place in places:
+            place['search_type'] = search_type
+        return places
+
+    # Basic place search by type with style preference
+    type_searches = [
+        asyncio.ensure_future(search(
+            place_type,
+            place_type,
+            query=f"{style_keyword}{place_type} in {location_name}",
+            type=place_type
+        ))
+        for place_type in search_types
+    ]
+    all_results, truncated = await _collect(type_searches, budgets["search"], "search")
+
+    # If we need more results, try using keywords
+    if len(all_results) < 5 and keywords:
+        remaining = budgets["search"] - (loop.time() - started) if budgets["search"] is not None else None
+        keyword_searches = [
+            asyncio.ensure_future(search(
+                keyword,
+                f"{keyword} search",
+                query=f"{style_keyword}{keyword} in {location_name}"
+            ))
+            for keyword in keywords
+        ]
+        keyword_results, keywords_truncated = await _collect(keyword_searches, remaining, "search")
+        all_results += keyword_results
+        truncated = truncated or keywords_truncated
+
+    top_places = rank_places(all_results, travel_style, limit)
+    detailed_places, details_truncated = await fetch_details(top_places, gmaps, budgets["details"])
+    return SearchResult(detailed_places, errors, truncated or details_truncated)
+
+def rank_places(places, travel_style="Any", limit=15):
+    """Deduplicate places, filter them by price level for the travel style and return the top ones"""
+    # Deduplicate results by place_id
+    unique_places = {}
+    for place in places:
+        if place['place_id'] not in unique_places:
+            unique_places[place['place_id']] = place
+
+    # Filter based on price level for travel style if applicable
+    filtered_places = unique_places.values()
+    if travel_style in PRICE_RANGES:
+        # Filter places by price level when available
+        price_filtered = []
+        no_price_info = []
+
+        for place in filtered_places:
+            if 'price_level' in place:
+                if place['price_level'] in PRICE_RANGES[travel_style]:
+                    price_filtered.append(place)
+            else:
+                # Keep places without price info as fallbacks
+                no_price_info.append(place)
+
+        # Use price-filtered places first, then add others if needed
+        if price_filtered:
+            filtered_places = price_filtered
+        elif not price_filtered and not no_price_info:
+            # If filtering removed all results, fall back to original list
+            filtered_places = unique_places.values()
+
+    # Sort by prominence and rating
+    sorted_places = sorted(
+        filtered_places,
+        key=lambda x: (x.get('rating', 0) * x.get('user_ratings_total', 1)/100),
+        reverse=True
+    )
+    return sorted_places[:min(limit, len(sorted_places))]
+
+async def fetch_details(places, gmaps, budget=None):
+    """
+    Merge Place Details into each place, keeping the basic data for places not fetched within
+    budget, and return the places along with whether any ran out of time
+    """
+    semaphore = asyncio.Semaphore(DETAILS_CONCURRENCY)
+
+    async def details_for(place):
+        async with semaphore:
+            try:
+                details = await asyncio.to_thread(gmaps.place, place_id=place['place_id'], fields=DETAIL_FIELDS)
+            except Exception:
+                # If we can't get details, just use the basic place data
+                return place
+        if 'result' in details:
+            return {**place, **details['result']}
+        return None
+
+    tasks = [asyncio.ensure_future(details_for(place)) for place in places]
+    if not tasks:
+        return [], False
+
+    done, pending = await asyncio.wait(tasks, timeout=budget)
+    if pending:
+        # Out of time: keep the basic place data for the rest
+        _record_metric("details_overruns")
+        for task in pending:
+            task.cancel()
+
+    detailed_places = []
+    for place, task in zip(places, tasks):
+        if task in done:
+            if task.result() is not None:
+                detailed_places.append(task.result())
+        else:
+            detailed_places.append(place)
+    return detailed_places, bool(pending)
+
+def process_place(place):
+    """Reduce raw Places data to the fields the recommendation cards and map use"""
+    processed_place = {
+        "name": place.get("name", "Unknown"),
+        "rating": place.get("rating", "N/A"),
+        "total_ratings": place.get("user_ratings_total", 0),
+        "address": place.get("vicinity", place.get("formatted_address", "Address not available")),
+        "place_id": place.get("place_id", ""),
+        "types": place.get("types", []),
+        "location": place.get("geometry", {}).get("location", {}),
+        "price_level": place.get("price_level", None),
+        "opening_hours": place.get("opening_hours", {}).get("weekday_text", []),
+        "photos": place.get("photos", []),
+        "url": place.get("url", ""),
+        "website": place.get("website", "")
+    }
+
+    # Add current open status
+    if "opening_hours" in place and "open_now" in place["opening_hours"]:
+        processed_place["open_now"] = place["opening_hours"]["open_now"]
+    else:
+        processed_place["open_now"] = None
+
+    return processed_place
+
+def enriched_result(original, enhanced_places):
+    """Build the result that replaces original once LLM descriptions arrive after the deadline"""
+    return RecommendationResult(enhanced_places, original.errors, enriched=True, truncated=original.truncated)
+
+# Function to get place recommendations with travel style preference
+@tiered_cached(
+    "recommendations",
+    RECOMMENDATIONS_CACHE_TTL,
+    ignore=("gmaps", "llm", "budgets", "on_enriched"),
+    # Fallback descriptions, LLM failures and budget-truncated searches are never shared
+    should_cache=lambda result: result.enriched and not result.errors and not result.truncated,
+    encode=to_dict,
+    decode=RecommendationResult.from_dict,
+    late_result_arg="on_enriched",
+    late_result=enriched_result
+)
+async def recommend(category, location_name, location_coords, gmaps, llm, travel_style="Any", budgets=None, on_enriched=None, refresh=False):
+    """
+    Get recommendations for a specific category at a location, filtered by travel style
+
+    If the LLM does not answer within budgets["llm"] seconds, places are returned right away
+    with simple descriptions and the LLM call keeps running on the event loop. When it
+    finishes, on_enriched is called with the LLM-enhanced places so they can replace the
+    fallback ones. Pass refresh=True to skip the tiered cache for both the recommendations
+    and the search behind them, and overwrite what is stored.
+    """
+    budgets = {**DEFAULT_STAGE_BUDGETS, **(budgets or {})}
+
+    search = await search_places(
+        category,
+        location_coords,
+        location_name,
+        gmaps,
+        travel_style,
+        radius=RECOMMENDATION_RADIUS,
+        limit=RECOMMENDATION_LIMIT,
+        budgets=budgets,
+        refresh=refresh
+    )
+    processed_places = [process_place(place) for place in search.places]
+    errors = list(search.errors)
+
+    if not processed_places:
+        return RecommendationResult(processed_places, errors, truncated=search.truncated)
+
+    # The LLM works on its own copy so a late answer never mutates places already returned
+    enrichment = asyncio.ensure_future(enrich(
+        copy.deepcopy(processed_places),
+        category,
+        location_name,
+        llm,
+        travel_style
+    ))
+
+    done, _ = await asyncio.wait({enrichment}, timeout=budgets["llm"])
+    if not done:
+        _record_metric("llm_fallback")
+        _background_tasks.add(enrichment)
+        enrichment.add_done_callback(lambda task: _deliver_late_enrichment(task, on_enriched))
+        return RecommendationResult(
+            generate_simple_descriptions(processed_places, category, location_name, travel_style),
+            errors,
+            truncated=search.truncated
+        )
+
+    try:
+        enhanced_places = enrichment.result()
+    except LLMResponseError as je:
+        _record_metric("llm_failed")
+        errors.append(PipelineError("llm", f"Error parsing LLM response as JSON: {str(je)}", je.response))
+        return RecommendationResult(processed_places, errors, truncated=search.truncated)
+    except Exception as e:
+        _record_metric("llm_failed")
+        # Fall back to the processed places without enhancements
+        errors.append(PipelineError("llm", f"Error enhancing recommendations: {str(e)}"))
+        return RecommendationResult(processed_places, errors, truncated=search.truncated)
+
+    if enhanced_places is None:
+        _record_metric("llm_failed")
+        return RecommendationResult(processed_places, errors, truncated=search.truncated)
+
+    _record_metric("llm_on_time")
+    return RecommendationResult(enhanced_places, errors, enriched=True, truncated=search.truncated)
+
+def recommendation_key(category, location_name, location_coords, travel_style="Any"):
+    """
+    Return the tiered cache key for recommend's result with these arguments
+
+    Caches in front of recommend use the same key so that an invalidation of the tiered entry
+    (see TieredCache.add_invalidation_listener) drops their copies too.
+    """
+    return recommend.cache_key(category, location_name, location_coords, None, None, travel_style)
+
+def _deliver_late_enrichment(task, on_enriched):
+    """Hand LLM results that arrived after the deadline to the caller's callback"""
+    _background_tasks.discard(task)
+    enhanced_places = None
+    if not task.cancelled() and task.exception() is None:
+        enhanced_places = task.result()
+
+    if enhanced_places is None:
+        _record_metric("llm_failed")
+        return
+
+    _record_metric("llm_upgraded")
+    if on_enriched is not None:
+        on_enriched(enhanced_places)
+
+# Function to add LLM-generated descriptions and highlights to processed places
+async def enrich(processed_places, category, location_name, llm, travel_style="Any"):
+    """
+    Ask the LLM for a description and highlights per place and merge them into the places
+
+    Returns None if the response does not contain a recommendations list.
+    """
+    # Create a template for the recommendations that includes travel style
+    recommendation_template = """
+        You are a travel expert specializing in {category} recommendations.
+        Based on the following places in {location_name}, provide brief recommendations
+        aligned with a {travel_style} travel style.
+
+        For each place, write one concise sentence describing what makes it special.
+        Keep descriptions short but informative.
+
+        Places data: {places_data}
+
+        FORMAT YOUR RESPONSE AS A VALID JSON OBJECT with this structure:
+        {{
+            "recommendations": [
+                {{
+                    "place_id": "the place_id",
+                    "name": "Place Name",
+                    "description": "Brief description",
+                    "highlights": ["Highlight 1", "Highlight 2"]
+                }}
+            ]
+        }}
+
+        Limit to 2-3 highlights per place. Be very concise.
+        """
+
+    prompt = PromptTemplate(
+        input_variables=["category", "location_name", "travel_style", "places_data"],
+        template=recommendation_template
+    )
+
+    # Create a runnable sequence instead of an LLMChain
+    recommendation_chain = prompt | llm
+
+    simplified_places = []
+    for place in processed_places[:10]:
+        simplified_place = {
+            "place_id": place.get("place_id", ""),
+            "name": place.get("name", "Unknown"),
+            "rating": place.get("rating", "N/A"),
+            "total_ratings": place.get("total_ratings", 0),
+            "address": place.get("address", ""),
+            "types": place.get("types", [])[:3],  # Just first 3 types
+            "price_level": place.get("price_level", None)
+        }
+        simplified_places.append(simplified_place)
+
+    enhanced_results = (await recommendation_chain.ainvoke({
+        "category": category,
+        "location_name": location_name,
+        "travel_style": travel_style,
+        "places_data": json.dumps(simplified_places)
+    })).content
+
+    # Process the LLM response
+    try:
+        # Extract the JSON from the response
+        # First try direct JSON parsing
+        recommendations = json.loads(enhanced_results)
+
+        # If that fails, try to extract JSON from text
+        if not isinstance(recommendations, dict):
+            start_idx = enhanced_results.find('{')
+            end_idx = enhanced_results.rfind('}') + 1
+
+            if start_idx >= 0 and end_idx > start_idx:
+                json_result = enhanced_results[start_idx:end_idx]
+                recommendations = json.loads(json_result)
+    except json.JSONDecodeError as je:
+        raise LLMResponseError(str(je), enhanced_results) from je
+
+    # Merge the enhanced descriptions with the original place data
+    if "recommendations" not in recommendations or not isinstance(recommendations["recommendations"], list):
+        return None
+
+    enhanced_places = []
+    rec_dict = {r["place_id"]: r for r in recommendations["recommendations"]}
+
+    for place in processed_places:
+        if place["place_id"] in rec_dict:
+            # Add the description and highlights
+            place["description"] = rec_dict[place["place_id"]].get("description", "")
+            place["highlights"] = rec_dict[place["place_id"]].get("highlights", [])
+        else:
+            place["description"] = ""
+            place["highlights"] = []
+        place["description_source"] = "llm"
+        enhanced_places.append(place)
+
+    return enhanced_places
+
+# Fallback description generation function that includes travel style
+def generate_simple_descriptions(places, category, location_name, travel_style="Any"):
+    """Generate simple descriptions for places if LLM enhancement fails"""
+    for place in places:
+        # Create a simple description based on available data
+        rating_text = ""
+        if place.get("rating", 0) >= 4.5:
+            rating_text = "highly-rated"
+        elif place.get("rating", 0) >= 4.0:
+            rating_text = "well-rated"
+        
+        type_text = ""
+        if place.get("types"):
+            place_types = [t.replace("_", " ") for t in place.get("types", [])[:2]]
+            if place_types:
+                type_text = f"{', '.join(place_types)}"
+        
+        # Include travel style in description
+        style_text = ""
+        if travel_style != "Any":
+            style_text = f"for {travel_style} travelers "
+        
+        # Generate description
+        if rating_text and type_text:
+            place["description"] = f"A {rating_text} {type_text} in {location_name}. Great choice {style_text}for {category} enthusiasts."
+        elif rating_text:
+            place["description"] = f"A {rating_text} establishment in {location_name}. Worth checking out {style_text}during your visit."
+        else:
+            place["description"] = f"An interesting {category} option in {location_name} {style_text}."
+        
+        # Generate simple highlights
+        highlights = []
+        if place.get("rating", 0) >= 4.0:
+            highlights.append(f"Rated {place.get('rating', 'N/A')}/5 by {place.get('total_ratings', 0)} visitors")
+        
+        if place.get("price_level") is not None:
+            price_terms = ["Budget-friendly", "Moderately priced", "Upscale", "Luxury"]
+            if place["price_level"] < len(price_terms):
+                highlights.append(price_terms[place["price_level"]])
+        
+        if place.get("open_now") is True:
+            highlights.append("Currently open for visitors")
+            
+        # Add travel style highlight
+        if travel_style == "Budget":
+            highlights.append("Good value for money")
+        elif travel_style == "Mid-range":
+            highlights.append("Great balance of quality and price")
+        elif travel_style == "Luxury":
+            highlights.append("Premium experience")
+            
+        # Add location-based highlight
+        highlights.append(f"Located in {location_name}")
+        
+        place["highlights"] = highlights
+        place["description_source"] = "simple"
+    
+    return places
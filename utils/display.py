@@ -1,62 +1,203 @@
+import html
+import time
 import streamlit as st
 
+# Number of cards shown per page before "Load more"
+CARDS_PER_PAGE = 9
+
+# Styles for the pre-rendered card grid
+CARD_GRID_CSS = """
+<style>
+.it-card-grid {
+    display: grid;
+    grid-template-columns: repeat(3, minmax(0, 1fr));
+    gap: 1rem;
+}
+@media (max-width: 900px) {
+    .it-card-grid { grid-template-columns: minmax(0, 1fr); }
+}
+.it-card {
+    border: 1px solid rgba(49, 51, 63, 0.2);
+    border-radius: 0.5rem;
+    padding: 1rem;
+}
+.it-card h3 { margin-top: 0; padding-top: 0; }
+.it-card p { margin-bottom: 0.5rem; }
+.it-card ul { margin-bottom: 0.5rem; }
+.it-card-links a {
+    display: inline-block;
+    margin-right: 0.5rem;
+    padding: 0.25rem 0.75rem;
+    border: 1px solid rgba(49, 51, 63, 0.2);
+    border-radius: 0.5rem;
+    text-decoration: none;
+}
+</style>
+"""
+
+# Function to build the HTML for a single recommendation card
+@st.cache_data(show_spinner=False, max_entries=512)
+def render_card_html(place):
+    """Render one place as a self-contained HTML card, memoized on the place data"""
+    parts = ['<div class="it-card">']
+    parts.append(f"<h3>{html.escape(str(place.get('name', 'Unknown Place')))}</h3>")
+
+    # Rating with stars
+    rating = place.get('rating', 0)
+    if rating:
+        rating_stars = "★" * int(rating) + "☆" * (5 - int(rating))
+        parts.append(f"<p>{html.escape(str(rating))}/5.0 ({rating_stars}) • {place.get('total_ratings', 0)} reviews</p>")
+
+    # Price level
+    price_level = place.get('price_level', None)
+    if price_level is not None:
+        parts.append(f"<p>{'$' * price_level}</p>")
+
+    # Open status
+    if place.get('open_now') is not None:
+        status = "🟢 Open now" if place['open_now'] else "🔴 Closed"
+        parts.append(f"<p>{status}</p>")
+
+    # Description (from LLM)
+    if place.get('description'):
+        parts.append(f"<p>{html.escape(place['description'])}</p>")
+
+    # Highlights
+    if place.get('highlights') and len(place['highlights']) > 0:
+        items = "".join(f"<li>{html.escape(str(highlight))}</li>" for highlight in place['highlights'][:3])
+        parts.append(f"<p><strong>Highlights:</strong></p><ul>{items}</ul>")
+
+    # Address
+    parts.append(f"<p>📍 {html.escape(str(place.get('address', 'Address not available')))}</p>")
+
+    # Links
+    links = []
+    if place.get('website'):
+        links.append(f'<a href="{html.escape(place["website"], quote=True)}" target="_blank">Website</a>')
+    if place.get('url'):
+        links.append(f'<a href="{html.escape(place["url"], quote=True)}" target="_blank">Google Maps</a>')
+    if links:
+        parts.append(f'<div class="it-card-links">{"".join(links)}</div>')
+
+    parts.append("</div>")
+    return "".join(parts)
+
 # Function to display recommendations in a card-based layout
-def display_recommendation_cards(places, category):
-    """Display recommendations in a card-based layout similar to Google"""
+def display_recommendation_cards(places, category, mode="batched", page_size=CARDS_PER_PAGE):
+    """
+    Display recommendations in a card-based layout similar to Google
+
+    In "batched" mode the visible grid is sent as a single pre-rendered HTML block; "classic"
+    mode renders each card from individual Streamlit elements. Both show page_size cards at a
+    time with a "Load more" button, and record an estimate of the delta messages sent and the
+    render time of the last render in st.session_state.card_render_stats.
+    """
     if not places:
         st.info(f"No {category} recommendations found for this location.")
         return
-    
+
+    started = time.perf_counter()
+
+    # Number of cards revealed so far for this category
+    shown_key = f"cards_shown_{category}"
+    if shown_key not in st.session_state:
+        st.session_state[shown_key] = page_size
+    visible_places = places[:st.session_state[shown_key]]
+
+    if mode == "classic":
+        elements = _display_cards_classic(visible_places)
+    else:
+        cards_html = "".join(render_card_html(place) for place in visible_places)
+        st.markdown(f'{CARD_GRID_CSS}<div class="it-card-grid">{cards_html}</div>', unsafe_allow_html=True)
+        elements = 1
+
+    # Pagination
+    st.caption(f"Showing {len(visible_places)} of {len(places)} recommendations.")
+    elements += 1
+    if len(visible_places) < len(places):
+        if st.button("Load more", key=f"load_more_{category}"):
+            st.session_state[shown_key] += page_size
+            st.rerun()
+        elements += 1
+
+    if 'card_render_stats' not in st.session_state:
+        st.session_state.card_render_stats = {}
+    st.session_state.card_render_stats[category] = {
+        "mode": mode,
+        "cards": len(visible_places),
+        "elements": elements,
+        "render_ms": (time.perf_counter() - started) * 1000
+    }
+
+# Render cards one Streamlit element at a time, returning the number of delta messages sent
+def _display_cards_classic(places):
+    """
+    Display each place from individual Streamlit elements in a 3-column layout
+
+    The returned count is tallied at the call sites, so it is an estimate of the delta messages
+    sent: st.columns(n) counts as one block for the row plus one per column.
+    """
     # Create 3 columns for cards
     cols = st.columns(3)
-    
+    elements = 1 + 3
+
     # Display each place in a card
     for i, place in enumerate(places):
         col = cols[i % 3]
-        
+
         with col:
             with st.container(border=True):
+                elements += 1
+
                 # Display place name
                 st.subheader(place.get('name', 'Unknown Place'))
-                
+                elements += 1
+
                 # Display rating with stars
                 rating = place.get('rating', 0)
                 if rating:
                     rating_stars = "★" * int(rating) + "☆" * (5 - int(rating))
                     rating_str = f"{rating}/5.0 ({rating_stars}) • {place.get('total_ratings', 0)} reviews"
                     st.write(rating_str)
-                
+                    elements += 1
+
                 # Price level
                 price_level = place.get('price_level', None)
                 if price_level is not None:
                     st.write("".join(["$" for _ in range(price_level)]))
-                
+                    elements += 1
+
                 # Open status
                 if place.get('open_now') is not None:
                     status = "🟢 Open now" if place['open_now'] else "🔴 Closed"
                     st.write(status)
-                
+                    elements += 1
+
                 # Description (from LLM)
                 if place.get('description'):
                     st.write(place['description'])
-                
+                    elements += 1
+
                 # Highlights
                 if place.get('highlights') and len(place['highlights']) > 0:
                     st.write("**Highlights:**")
+                    elements += 1
                     for highlight in place['highlights'][:3]:
                         st.write(f"• {highlight}")
-                
+                        elements += 1
+
                 # Address
                 st.write(f"📍 {place.get('address', 'Address not available')}")
-                
+                elements += 1
+
                 # Links
                 cols2 = st.columns(2)
+                elements += 1 + 2
                 if place.get('website'):
                     cols2[0].link_button("Website", place['website'])
+                    elements += 1
                 if place.get('url'):
                     cols2[1].link_button("Google Maps", place['url'])
-        
-        # Only show the first 9 places to avoid overcrowding
-        if i >= 9:
-            st.info(f"Showing top {i+1} recommendations.")
-            break
\ No newline at end of file
+                    elements += 1
+
+    return elements
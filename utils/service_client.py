@@ -0,0 +1,48 @@
+import json
+import urllib.error
+import urllib.request
+from utils.core import GeocodeResult, RecommendationResult
+
+# Raised when the recommendation service cannot be reached or rejects a request
+class ServiceError(Exception):
+    pass
+
+# Client for the recommendation service in service.py
+class RecommendationServiceClient:
+    """Call the local recommendation HTTP/JSON service instead of running the pipeline in-process"""
+
+    def __init__(self, base_url, timeout=60):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+
+    def geocode(self, location_name):
+        """Convert location name to coordinates, returning a GeocodeResult"""
+        return GeocodeResult.from_dict(self._post("/geocode", {"location": location_name}))
+
+    def recommendations(self, category, location_name, location_coords, travel_style="Any"):
+        """Get recommendations for a category at a location, returning a RecommendationResult"""
+        return RecommendationResult.from_dict(self._post("/recommendations", {
+            "category": category,
+            "location": location_name,
+            "coordinates": {"lat": location_coords["lat"], "lng": location_coords["lng"]},
+            "travel_style": travel_style
+        }))
+
+    def _post(self, path, payload):
+        request = urllib.request.Request(
+            f"{self.base_url}{path}",
+            data=json.dumps(payload).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+            method="POST"
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            try:
+                message = json.loads(e.read()).get("error", e.reason)
+            except ValueError:
+                message = e.reason
+            raise ServiceError(f"Recommendation service returned {e.code}: {message}") from e
+        except (urllib.error.URLError, OSError, ValueError) as e:
+            raise ServiceError(f"Could not reach recommendation service: {e}") from e
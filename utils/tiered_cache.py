@@ -0,0 +1,498 @@
+"""
+Two-tier result cache shared between app replicas
+
+L1 is a bounded in-process LRU; L2 is a Redis-protocol store shared by every node. Values are
+stored in a compact binary form (msgpack when installed, zlib-compressed JSON otherwise) under
+keys that carry CACHE_SCHEMA_VERSION, so a deploy that changes the shape of cached results
+never reads entries written by the old code. Invalidations can be broadcast to the L1 tier of
+every node over a pub/sub channel.
+
+Configuration:
+    REDIS_URL                 redis://host:6379/0 for a shared L2, memory:// for the
+                              in-process stand-in; unset means L1 only
+    CACHE_L1_MAX_ENTRIES      L1 capacity (default 1024)
+    CACHE_INVALIDATION        "1" to publish and listen for cross-node invalidations
+"""
+import asyncio
+import functools
+import hashlib
+import inspect
+import json
+import os
+import queue
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+# Bump whenever the shape of a cached result changes
+CACHE_SCHEMA_VERSION = 1
+
+KEY_PREFIX = "intellitravel"
+INVALIDATION_CHANNEL = f"{KEY_PREFIX}:invalidate"
+
+_MSGPACK = b"m"
+_ZLIB_JSON = b"z"
+
+def serialize(value):
+    """Encode a JSON-compatible value as compact bytes tagged with their format"""
+    if msgpack is not None:
+        return _MSGPACK + msgpack.packb(value, use_bin_type=True)
+    return _ZLIB_JSON + zlib.compress(json.dumps(value, separators=(",", ":")).encode("utf-8"))
+
+def deserialize(data):
+    """Decode bytes produced by serialize"""
+    tag, payload = data[:1], data[1:]
+    if tag == _MSGPACK:
+        if msgpack is None:
+            raise ValueError("Cached value was written with msgpack, which is not installed")
+        return msgpack.unpackb(payload, raw=False)
+    if tag == _ZLIB_JSON:
+        return json.loads(zlib.decompress(payload))
+    raise ValueError(f"Unknown cache value format {tag!r}")
+
+def make_key(namespace, args):
+    """Build a versioned cache key from a namespace and JSON-compatible arguments"""
+    digest = hashlib.sha256(json.dumps(args, sort_keys=True, default=str).encode("utf-8")).hexdigest()[:32]
+    return f"{KEY_PREFIX}:v{CACHE_SCHEMA_VERSION}:{namespace}:{digest}"
+
+# Bounded in-process LRU holding serialized values
+class LRUCache:
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            data, expires_at = entry
+            if expires_at is not None and time.monotonic() >= expires_at:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return data
+
+    def set(self, key, data, ttl=None):
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._entries[key] = (data, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+# In-process stand-in for the subset of the Redis API the cache uses
+class InMemoryRedis:
+    """Behaves like redis.Redis for get/set/pttl/delete/publish/pubsub; share one instance to simulate nodes"""
+
+    def __init__(self):
+        self._data = {}
+        self._subscribers = {}
+        self._lock = threading.Lock()
+
+    def get(self, name):
+        with self._lock:
+            entry = self._data.get(name)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and time.monotonic() >= expires_at:
+                del self._data[name]
+                return None
+            return value
+
+    def set(self, name, value, ex=None):
+        with self._lock:
+            self._data[name] = (bytes(value), time.monotonic() + ex if ex else None)
+        return True
+
+    def pttl(self, name):
+        """Milliseconds until name expires, -1 if it never does, -2 if it does not exist"""
+        with self._lock:
+            entry = self._data.get(name)
+            if entry is None:
+                return -2
+            expires_at = entry[1]
+            if expires_at is None:
+                return -1
+            remaining = expires_at - time.monotonic()
+            if remaining <= 0:
+                del self._data[name]
+                return -2
+            return int(remaining * 1000)
+
+    def delete(self, *names):
+        with self._lock:
+            return sum(1 for name in names if self._data.pop(name, None) is not None)
+
+    def publish(self, channel, message):
+        if isinstance(message, str):
+            message = message.encode("utf-8")
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, []))
+        for subscriber in subscribers:
+            subscriber.put({"type": "message", "channel": channel.encode("utf-8"), "data": message})
+        return len(subscribers)
+
+    def pubsub(self, ignore_subscribe_messages=False):
+        return _InMemoryPubSub(self)
+
+class _InMemoryPubSub:
+    def __init__(self, server):
+        self._server = server
+        self._messages = queue.Queue()
+
+    def subscribe(self, *channels):
+        with self._server._lock:
+            for channel in channels:
+                self._server._subscribers.setdefault(channel, []).append(self._messages)
+
+    def get_message(self, ignore_subscribe_messages=False, timeout=0.0):
+        try:
+            return self._messages.get(timeout=timeout) if timeout else self._messages.get_nowait()
+        except queue.Empty:
+            return None
+
+    def close(self):
+        with self._server._lock:
+            for subscribers in self._server._subscribers.values():
+                if self._messages in subscribers:
+                    subscribers.remove(self._messages)
+
+# L1 + L2 cache with per-tier statistics
+class TieredCache:
+    """
+    Look values up in the local LRU first, then the shared store, then compute them
+
+    L2 failures are counted and treated as misses so a store outage only costs hit ratio.
+    Caches layered in front of this one can register an invalidation listener to drop their
+    own copies whenever a key is invalidated here or, with invalidation on, by another node.
+    """
+
+    def __init__(self, l1=None, l2=None, invalidation=False):
+        self.l1 = l1 if l1 is not None else LRUCache()
+        self.l2 = l2
+        self._lock = threading.Lock()
+        self._stats = {
+            "l1_hits": 0,
+            "l1_misses": 0,
+            "l2_hits": 0,
+            "l2_misses": 0,
+            "l2_errors": 0,
+            "serialize_count": 0,
+            "serialize_seconds": 0.0,
+            "serialized_bytes": 0,
+            "deserialize_count": 0,
+            "deserialize_seconds": 0.0,
+            "invalidations_received": 0
+        }
+        self._listeners = []
+        self._pubsub = None
+        if invalidation and l2 is not None:
+            self._start_invalidation_listener()
+
+    def get(self, key, ttl=None):
+        """
+        Return (found, value) for key, promoting L2 hits into L1
+
+        A promoted entry lives in L1 for at most ttl seconds and never longer than it has left
+        in L2, so L1 copies cannot outlive the shared entry they came from.
+        """
+        data = self.l1.get(key)
+        if data is not None:
+            self._increment("l1_hits")
+            return True, self._deserialize(data)
+        self._increment("l1_misses")
+
+        if self.l2 is None:
+            return False, None
+        try:
+            data = self.l2.get(key)
+        except Exception:
+            self._increment("l2_errors")
+            return False, None
+        if data is None:
+            self._increment("l2_misses")
+            return False, None
+
+        self._increment("l2_hits")
+        value = self._deserialize(data)
+        remaining = self._l2_remaining_ttl(key)
+        if remaining is None:
+            self.l1.set(key, data, ttl)
+        elif remaining > 0:
+            self.l1.set(key, data, min(ttl, remaining) if ttl else remaining)
+        return True, value
+
+    def set(self, key, value, ttl=None):
+        """Store value in both tiers"""
+        data = self._serialize(value)
+        self.l1.set(key, data, ttl)
+        if self.l2 is not None:
+            try:
+                self.l2.set(key, data, ex=int(ttl) if ttl else None)
+            except Exception:
+                self._increment("l2_errors")
+
+    def invalidate(self, key):
+        """Remove key from both tiers and tell other nodes to drop it from their L1"""
+        self.l1.delete(key)
+        self._notify_listeners(key)
+        if self.l2 is None:
+            return
+        try:
+            self.l2.delete(key)
+            if self._pubsub is not None:
+                self.l2.publish(INVALIDATION_CHANNEL, key)
+        except Exception:
+            self._increment("l2_errors")
+
+    def add_invalidation_listener(self, callback):
+        """Call callback(key) for every key invalidated on this node or received from another"""
+        with self._lock:
+            self._listeners.append(callback)
+
+    def remove_invalidation_listener(self, callback):
+        with self._lock:
+            if callback in self._listeners:
+                self._listeners.remove(callback)
+
+    def stats(self):
+        """Return counters plus per-tier hit ratios and average serialization cost"""
+        with self._lock:
+            stats = dict(self._stats)
+        l1_lookups = stats["l1_hits"] + stats["l1_misses"]
+        l2_lookups = stats["l2_hits"] + stats["l2_misses"]
+        stats["l1_hit_ratio"] = stats["l1_hits"] / l1_lookups if l1_lookups else 0.0
+        stats["l2_hit_ratio"] = stats["l2_hits"] / l2_lookups if l2_lookups else 0.0
+        stats["overall_hit_ratio"] = (stats["l1_hits"] + stats["l2_hits"]) / l1_lookups if l1_lookups else 0.0
+        stats["avg_serialize_ms"] = (
+            stats["serialize_seconds"] * 1000 / stats["serialize_count"] if stats["serialize_count"] else 0.0
+        )
+        stats["avg_deserialize_ms"] = (
+            stats["deserialize_seconds"] * 1000 / stats["deserialize_count"] if stats["deserialize_count"] else 0.0
+        )
+        stats["avg_serialized_bytes"] = (
+            stats["serialized_bytes"] / stats["serialize_count"] if stats["serialize_count"] else 0.0
+        )
+        stats["l1_entries"] = len(self.l1)
+        stats["format"] = "msgpack" if msgpack is not None else "zlib-json"
+        return stats
+
+    def _l2_remaining_ttl(self, key):
+        """Seconds key has left in L2, None if it has no expiry, 0 if unknown or already gone"""
+        try:
+            remaining_ms = self.l2.pttl(key)
+        except Exception:
+            self._increment("l2_errors")
+            return 0
+        if remaining_ms == -1:
+            return None
+        return max(remaining_ms, 0) / 1000
+
+    def _serialize(self, value):
+        started = time.perf_counter()
+        data = serialize(value)
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self._stats["serialize_count"] += 1
+            self._stats["serialize_seconds"] += elapsed
+            self._stats["serialized_bytes"] += len(data)
+        return data
+
+    def _deserialize(self, data):
+        started = time.perf_counter()
+        value = deserialize(data)
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self._stats["deserialize_count"] += 1
+            self._stats["deserialize_seconds"] += elapsed
+        return value
+
+    def _increment(self, counter):
+        with self._lock:
+            self._stats[counter] += 1
+
+    def _start_invalidation_listener(self):
+        self._pubsub = self.l2.pubsub(ignore_subscribe_messages=True)
+        self._pubsub.subscribe(INVALIDATION_CHANNEL)
+        threading.Thread(target=self._listen_for_invalidations, name="cache-invalidation", daemon=True).start()
+
+    def _listen_for_invalidations(self):
+        while True:
+            try:
+                message = self._pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+            except Exception:
+                self._increment("l2_errors")
+                time.sleep(1.0)
+                continue
+            if not message or message.get("type") != "message":
+                continue
+            key = message["data"]
+            key = key.decode("utf-8") if isinstance(key, bytes) else key
+            self.l1.delete(key)
+            self._notify_listeners(key)
+            self._increment("invalidations_received")
+
+    def _notify_listeners(self, key):
+        with self._lock:
+            listeners = list(self._listeners)
+        for listener in listeners:
+            try:
+                listener(key)
+            except Exception:
+                # A broken listener must not stop invalidations reaching the others
+                pass
+
+_tiered_cache = None
+_tiered_cache_lock = threading.Lock()
+
+def get_tiered_cache():
+    """Return the process-wide TieredCache, configured from the environment on first use"""
+    global _tiered_cache
+    with _tiered_cache_lock:
+        if _tiered_cache is None:
+            redis_url = os.getenv("REDIS_URL")
+            if not redis_url:
+                l2 = None
+            elif redis_url.startswith("memory://"):
+                l2 = InMemoryRedis()
+            elif redis is None:
+                raise ImportError("REDIS_URL is set but the 'redis' package is not installed")
+            else:
+                l2 = redis.Redis.from_url(redis_url)
+            _tiered_cache = TieredCache(
+                l1=LRUCache(int(os.getenv("CACHE_L1_MAX_ENTRIES", "1024"))),
+                l2=l2,
+                invalidation=os.getenv("CACHE_INVALIDATION") == "1"
+            )
+        return _tiered_cache
+
+def set_tiered_cache(cache):
+    """Replace the process-wide TieredCache, e.g. with one backed by InMemoryRedis"""
+    global _tiered_cache
+    with _tiered_cache_lock:
+        _tiered_cache = cache
+
+def _default_should_cache(value):
+    # Empty results are usually caused by an upstream error, so they are not worth sharing
+    return bool(value)
+
+def _identity(value):
+    return value
+
+def tiered_cached(namespace, ttl, ignore=(), should_cache=_default_should_cache, encode=_identity,
+                  decode=_identity, late_result_arg=None, late_result=None):
+    """
+    Cache a function's result in the tiered cache; works on plain and async functions
+
+    The key is built from the bound arguments, skipping those named in ignore (API clients,
+    budgets, callbacks). Results that pass should_cache are stored as encode(result), which
+    must be JSON-compatible, and cache hits are returned as decode(data).
+
+    Calling with refresh=True skips the lookup and overwrites the stored value. refresh is
+    never part of the key; it is passed on to the function if the function accepts it, so
+    nested cached calls can refresh too.
+
+    If late_result_arg names a callback argument, values passed to that callback later (e.g.
+    LLM descriptions that missed their deadline) are stored under the same key, as
+    late_result(original_result, late_value), before the original callback runs. In async
+    functions the cache is only touched from the loop's default executor, never the loop
+    thread itself.
+    """
+    ignore = set(ignore) | {"refresh"}
+
+    def decorator(func):
+        signature = inspect.signature(func)
+        passes_refresh = "refresh" in signature.parameters
+
+        def prepare(args, kwargs):
+            refresh = False if passes_refresh else kwargs.pop("refresh", False)
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            if passes_refresh:
+                refresh = bound.arguments["refresh"]
+            key_args = {name: value for name, value in bound.arguments.items() if name not in ignore}
+            return make_key(namespace, key_args), bound, refresh
+
+        def intercept_late_result(bound, original, store):
+            callback = bound.arguments.get(late_result_arg)
+
+            def store_late_result(late_value):
+                # original is filled in as soon as the function returns, before any late value
+                if original:
+                    result = late_result(original[0], late_value) if late_result else late_value
+                    if should_cache(result):
+                        store(encode(result))
+                if callback is not None:
+                    callback(late_value)
+
+            bound.arguments[late_result_arg] = store_late_result
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                cache = get_tiered_cache()
+                key, bound, refresh = prepare(args, kwargs)
+                loop = asyncio.get_running_loop()
+                if not refresh:
+                    found, data = await loop.run_in_executor(None, cache.get, key, ttl)
+                    if found:
+                        return decode(data)
+
+                original = []
+                if late_result_arg is not None:
+                    intercept_late_result(bound, original, lambda data: loop.run_in_executor(None, cache.set, key, data, ttl))
+
+                value = await func(*bound.args, **bound.kwargs)
+                original.append(value)
+                if should_cache(value):
+                    await loop.run_in_executor(None, cache.set, key, encode(value), ttl)
+                return value
+        else:
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                cache = get_tiered_cache()
+                key, bound, refresh = prepare(args, kwargs)
+                if not refresh:
+                    found, data = cache.get(key, ttl)
+                    if found:
+                        return decode(data)
+
+                original = []
+                if late_result_arg is not None:
+                    intercept_late_result(bound, original, lambda data: cache.set(key, data, ttl))
+
+                value = func(*bound.args, **bound.kwargs)
+                original.append(value)
+                if should_cache(value):
+                    cache.set(key, encode(value), ttl)
+                return value
+
+        wrapper.cache_key = lambda *args, **kwargs: prepare(args, dict(kwargs))[0]
+        return wrapper
+
+    return decorator